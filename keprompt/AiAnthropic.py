@@ -1,38 +1,54 @@
 from typing import Dict, List
-from rich.console import Console
 
-from . import FunctionSpace
+from .json_utils import json_fragment
 from .ModelManager import ModelManager
-from .AiProvider import AiProvider
-from .AiPrompt import AiMessage, AiTextPart, AiCall
-
-
-
-console = Console()
-terminal_width = console.size.width
+from .AiProvider import AiProvider, PartHandlers, tools_transform
+from .AiPrompt import AiMessage, AiTextPart, AiCall, Role
+
+
+# part.type -> Anthropic content block
+_ANTHROPIC_PART_HANDLERS = PartHandlers({
+    "text":      lambda part: {'type': 'text', 'text': part.text},
+    "image_url": lambda part: {'type': 'image', 'source': {'type': 'base64', 'media_type': part.media_type, 'data': part.file_contents}},
+    "call":      lambda part: {'type': 'tool_use', 'id': part.id, 'name': part.name, 'input': part.arguments},
+    "result":    lambda part: {'type': 'tool_result', 'tool_use_id': part.id, 'content': part.result},
+})
+
+# Anthropic response block type -> AiMessagePart
+_ANTHROPIC_RESPONSE_HANDLERS = {
+    "text":     lambda vm, part: AiTextPart(vm=vm, text=part["text"]),
+    "tool_use": lambda vm, part: AiCall(vm=vm, id=part["id"], name=part["name"], arguments=part["input"]),
+}
+
+
+@tools_transform
+def _anthropic_tools(filtered):
+    anthropic_tools = tuple(
+        {
+            "name": tool['function']['name'],
+            "description": tool['function']['description'],
+            "input_schema": tool['function']['parameters'],
+        }
+        for tool in filtered
+    )
+    return json_fragment(anthropic_tools) if anthropic_tools else None
 
 
 class AiAnthropic(AiProvider):
     litellm_provider = "anthropic"
 
     def prepare_request(self, messages: List[Dict]) -> Dict:
-        filtered = FunctionSpace.functions.get_filtered_tools_array(self.prompt.vm.allowed_functions)
-        anthropic_tools = [
-            {
-                "name": tool['function']['name'],
-                "description": tool['function']['description'],
-                "input_schema": tool['function']['parameters'],
-            }
-            for tool in filtered
-        ]
-        request = {
-            "model": ModelManager.get_model(self.prompt.model).get_api_model_name(),
-            "messages": messages,
-            "max_tokens": 4096
-        }
-        if anthropic_tools:
-            request["tools"] = anthropic_tools
-        return request
+        return {**self._request_envelope(), "messages": messages}
+
+    def _request_envelope(self) -> Dict:
+        """Request fields fixed for this prompt (model, max_tokens, tools); built once per handler."""
+        if not hasattr(self, '_envelope'):
+            envelope = {"model": ModelManager.get_model(self.prompt.model).get_api_model_name(), "max_tokens": 4096}
+            tools = _anthropic_tools(self.prompt.vm.allowed_functions)
+            if tools is not None:
+                envelope["tools"] = tools
+            self._envelope = envelope
+        return self._envelope
 
     def get_api_url(self) -> str:
         return "https://api.anthropic.com/v1/messages"
@@ -45,36 +61,22 @@ class AiAnthropic(AiProvider):
         }
 
     def to_ai_message(self, response: Dict) -> 'AiMessage':
-        content = []
-        resp_content = response.get("content", [])
-
-        for part in resp_content:
-            if part["type"] == "text":
-                content.append(AiTextPart(vm=self.prompt.vm, text=part["text"]))
-            elif part["type"] == "tool_use":
-                content.append(AiCall(vm=self.prompt.vm, id=part["id"],name=part["name"], arguments=part["input"]))
+        vm = self.prompt.vm
+        handlers = _ANTHROPIC_RESPONSE_HANDLERS
+        # Other block types (e.g. thinking) are skipped; () avoids allocating when "content" is missing or null
+        content = [handlers[ptype](vm, part) for part in response.get("content") or () if (ptype := part["type"]) in handlers]
 
         return AiMessage(vm=self.prompt.vm, role="assistant", content=content,
                         model_name=self.prompt.model, provider=self.prompt.provider)
     def to_company_messages(self, messages: List) -> List[Dict]:
-
-        company_messages = []
-        for msg in messages:
-            content = []
-            if msg.role == "system":
-                self.system_message = msg.content[0].text if msg.content else None
-            else:
-                for part in msg.content:
-                    if   part.type == "text":       content.append({'type': 'text', 'text': part.text})
-                    elif part.type == "image_url":  content.append({'type': 'image', 'source': {'type': 'base64', 'media_type': part.media_type, 'data': part.file_contents}})
-                    elif part.type == "call":       content.append({'type': 'tool_use', 'id': part.id, 'name': part.name, 'input': part.arguments})
-                    elif part.type == 'result':     content.append({'type': 'tool_result', 'tool_use_id': part.id, 'content': part.result})
-                    else: raise Exception(f"Unknown part type: {part.type}")
-
-                role = "assistant" if msg.role == "assistant" else "user"
-                company_messages.append({"role": role, "content": content})
-
-        return company_messages
+        handlers = _ANTHROPIC_PART_HANDLERS
+        return [
+            {
+                "role": "assistant" if msg.role_code == Role.ASSISTANT else "user",
+                "content": [handlers[part.type](part) for part in msg.content],
+            }
+            for msg in self.split_system_message(messages)
+        ]
 
     def extract_token_usage(self, response: Dict) -> tuple[int, int]:
         """Extract token usage from Anthropic API response"""
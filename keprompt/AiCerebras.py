@@ -1,15 +1,11 @@
 from typing import Dict, List
 import json
-from rich.console import Console
 
 from . import FunctionSpace
 from .ModelManager import ModelManager
 from .AiProvider import AiProvider
 from .AiPrompt import AiMessage, AiTextPart, AiCall
 
-console = Console()
-terminal_width = console.size.width
-
 
 class AiCerebras(AiProvider):
     litellm_provider = "cerebras"
@@ -50,11 +46,12 @@ class AiCerebras(AiProvider):
             tool_result_messages = []
 
             for part in msg.content:
-                if   part.type == "text":       content.append({"type": "text", "text": part.text})
-                elif part.type == "image_url":  content.append({'type': 'image_url','image_url': {'url': f"data:{part.media_type};base64,{part.file_contents}"}})
-                elif part.type == "call":       tool_calls.append({'id': part.id,'type': 'function','function': {'name': part.name,'arguments': json.dumps(part.arguments)}})
-                elif part.type == 'result':     tool_result_messages.append({'role': 'tool', 'tool_call_id': part.id, 'content': part.result})
-                else:                           raise ValueError(f"Unknown part type: {part.type}")
+                ptype = part.type
+                if   ptype == "text":       content.append({"type": "text", "text": part.text})
+                elif ptype == "image_url":  content.append({'type': 'image_url','image_url': {'url': part.data_url}})
+                elif ptype == "call":       tool_calls.append({'id': part.id,'type': 'function','function': {'name': part.name,'arguments': json.dumps(part.arguments)}})
+                elif ptype == 'result':     tool_result_messages.append({'role': 'tool', 'tool_call_id': part.id, 'content': part.result})
+                else:                      raise ValueError(f"Unknown part type: {ptype}")
 
             if msg.role == "system":
                 # Cerebras requires system content as a plain string
@@ -62,10 +59,11 @@ class AiCerebras(AiProvider):
             elif msg.role == "tool":
                 cerebras_messages.extend(tool_result_messages)
             else:
-                message = {"role": msg.role, "content": content[0]["text"] if len(content) == 1 else content}
+                message_content = content[0]["text"] if len(content) == 1 else content
                 if tool_calls:
-                    message["tool_calls"] = tool_calls
-                cerebras_messages.append(message)
+                    cerebras_messages.append({"role": msg.role, "content": message_content, "tool_calls": tool_calls})
+                else:
+                    cerebras_messages.append({"role": msg.role, "content": message_content})
 
         return cerebras_messages
 
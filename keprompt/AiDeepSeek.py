@@ -1,6 +1,5 @@
 from typing import Dict, List
 import json
-from rich.console import Console
 
 from . import FunctionSpace
 from .ModelManager import ModelManager
@@ -8,10 +7,6 @@ from .AiProvider import AiProvider
 from .AiPrompt import AiMessage, AiTextPart, AiCall
 
 
-console = Console()
-terminal_width = console.size.width
-
-
 class AiDeepSeek(AiProvider):
     litellm_provider = "deepseek"
     
@@ -65,11 +60,12 @@ class AiDeepSeek(AiProvider):
             content = []
             tool_calls = []
             for part in msg.content:
-                if   part.type == "text":       content.append({"type": "text", "text": part.text})
-                elif part.type == "image_url":  content.append({'type': 'image','source': {'type': 'base64','media_type': part.media_type,'data': part.file_contents}})
-                elif part.type == "call":       tool_calls.append({'type': 'function','id': part.id,'function': {'name':part.name, 'arguments':json.dumps(part.arguments)}})
-                elif part.type == 'result':     deepseek_messages.append({"role": "tool", "tool_call_id": part.id, "content": part.result})
-                else: raise Exception(f"Unknown part type: {part.type}")
+                ptype = part.type
+                if   ptype == "text":       content.append({"type": "text", "text": part.text})
+                elif ptype == "image_url":  content.append({'type': 'image','source': {'type': 'base64','media_type': part.media_type,'data': part.file_contents}})
+                elif ptype == "call":       tool_calls.append({'type': 'function','id': part.id,'function': {'name':part.name, 'arguments':json.dumps(part.arguments)}})
+                elif ptype == 'result':     deepseek_messages.append({"role": "tool", "tool_call_id": part.id, "content": part.result})
+                else: raise Exception(f"Unknown part type: {ptype}")
 
             if msg.role == "system":
                 deepseek_messages.append({"role": "user", "content": f"system: {content[0]['text']}"})
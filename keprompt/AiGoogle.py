@@ -1,33 +1,48 @@
 from typing import Dict, List
-import json
-from rich.console import Console
 
-from . import FunctionSpace
+from .json_utils import json_fragment
 from .ModelManager import ModelManager
-from .AiProvider import AiProvider
+from .AiProvider import AiProvider, PartHandlers, tools_transform
 from .AiPrompt import AiMessage, AiTextPart, AiCall, AiResult, AiPrompt
 
 
-console = Console()
-terminal_width = console.size.width
+# part.type -> Google content part
+_GOOGLE_PART_HANDLERS = PartHandlers({
+    "text":      lambda part: {"text": part.text},
+    "image_url": lambda part: {"inlineData": {"mimeType": part.media_type,"data": part.file_contents}},
+    "call":      lambda part: {"functionCall": {"name": part.name,"args": part.arguments}},
+    "result":    lambda part: {"functionResponse": {"name": part.name,"response": part.result,"id": part.id or ""}},
+})
+
+
+def _strip_addl(parameters: Dict) -> Dict:
+    """Drop 'additionalProperties' (rejected by Google); copy only when it is present."""
+    if 'additionalProperties' not in parameters:
+        return parameters
+    return {k: v for k, v in parameters.items() if k != 'additionalProperties'}
+
+
+@tools_transform
+def _google_tools(filtered):
+    google_tools = tuple(
+        {
+            "name": tool['function']['name'],
+            "description": tool['function']['description'],
+            "parameters": _strip_addl(tool['function']['parameters'])
+        }
+        for tool in filtered
+    )
+    return json_fragment(({"functionDeclarations": google_tools},)) if google_tools else None
 
 
 class AiGoogle(AiProvider):
     litellm_provider = "gemini"
     
     def prepare_request(self, messages: List[Dict]) -> Dict:
-        filtered = FunctionSpace.functions.get_filtered_tools_array(self.prompt.vm.allowed_functions)
-        google_tools = [
-            {
-                "name": tool['function']['name'],
-                "description": tool['function']['description'],
-                "parameters": {k: v for k, v in tool['function']['parameters'].items() if k != 'additionalProperties'}
-            }
-            for tool in filtered
-        ]
         request = {"contents": messages}
-        if google_tools:
-            request["tools"] = [{"functionDeclarations": google_tools}]
+        tools = _google_tools(self.prompt.vm.allowed_functions)
+        if tools is not None:
+            request["tools"] = tools
         if self.system_message:
             request["system_instruction"] = {"parts": [{"text": self.system_message}]}
         return request
@@ -39,39 +54,27 @@ class AiGoogle(AiProvider):
         return {"Content-Type": "application/json"}
 
     def to_ai_message(self, response: Dict) -> AiMessage:
-        candidates = response.get("candidates", [])
+        candidates = response.get("candidates")
         if not candidates:
             raise Exception("No response candidates received from Google API")
 
         content = []
+        _append = content.append
         for part in candidates[0]['content']["parts"]:
-            if   "text" in part:            content.append(AiTextPart(vm=self.prompt.vm, text=part["text"]))
+            if   "text" in part:            _append(AiTextPart(vm=self.prompt.vm, text=part["text"]))
             elif "functionCall" in part:
                 fc = part["functionCall"]
-                content.append(AiCall(vm=self.prompt.vm,name=fc["name"],arguments=fc.get("args", {}),id=fc.get("id", "")))
+                _append(AiCall(vm=self.prompt.vm,name=fc["name"],arguments=fc.get("args", {}),id=fc.get("id", "")))
 
         return AiMessage(vm=self.prompt.vm, role="assistant", content=content,
                         model_name=self.prompt.model, provider=self.prompt.provider)
 
     def to_company_messages(self, messages: List[AiMessage]) -> List[Dict]:
-        google_messages = []
-
-        for msg in messages:
-            if msg.role == "system":
-                self.system_message = msg.content[0].text if msg.content else None
-                continue
-
-            content = []
-            for part in msg.content:
-                if   part.type == "text":       content.append({"text": part.text})
-                elif part.type == "image_url":  content.append({"inlineData": {"mimeType": part.media_type,"data": part.file_contents}})
-                elif part.type == "call":       content.append({"functionCall": {"name": part.name,"args": part.arguments}})
-                elif part.type == "result":     content.append({"functionResponse": {"name": part.name,"response": part.result,"id": part.id or ""}})
-                else: raise Exception(f"Unknown part type: {part.type}")
-
-            google_messages.append({"role": msg.role, "parts": content})
-
-        return google_messages
+        handlers = _GOOGLE_PART_HANDLERS
+        return [
+            {"role": msg.role, "parts": [handlers[part.type](part) for part in msg.content]}
+            for msg in self.split_system_message(messages)
+        ]
 
     def extract_token_usage(self, response: Dict) -> tuple[int, int]:
         """Extract token usage from Google API response"""
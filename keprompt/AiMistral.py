@@ -1,26 +1,64 @@
 from typing import Dict, List
-from rich.console import Console
 
-from . import FunctionSpace
+from .json_utils import json_fragment
 from .ModelManager import ModelManager
-from .AiProvider import AiProvider
-from .AiPrompt import AiMessage, AiTextPart, AiCall
+from .AiProvider import AiProvider, PartHandlers, tools_transform
+from .AiPrompt import AiMessage, AiTextPart, AiCall, Role
 
 
-console = Console()
-terminal_width = console.size.width
+# Shared read-only default for missing response fields; never mutate
+_EMPTY = {}
+
+# part.type -> (bucket, builder); buckets are content, tool_calls and tool_results
+_CONTENT, _TOOL_CALLS, _TOOL_RESULTS = 0, 1, 2
+_MISTRAL_PART_HANDLERS = PartHandlers({
+    "text":      (_CONTENT,      lambda part: {"type": "text", "text": part.text}),
+    "image_url": (_CONTENT,      lambda part: {'type': 'image_url','image_url': {'url': part.data_url}}),
+    "call":      (_TOOL_CALLS,   lambda part: {'id': part.id,'type': 'function','function': {'name': part.name,'arguments': part.arguments}}),
+    "result":    (_TOOL_RESULTS, lambda part: {'id': part.id,'content': part.result}),
+}, error=ValueError)
+
+
+def _build_mistral_message(msg: AiMessage) -> Dict:
+    """Convert one non-system AiMessage, partitioning its parts in a single pass."""
+    content, tool_calls, results = [], [], []
+    appends = (content.append, tool_calls.append, results.append)
+    handlers = _MISTRAL_PART_HANDLERS
+    for part in msg.content:
+        bucket, build = handlers[part.type]
+        appends[bucket](build(part))
+
+    if msg.role_code == Role.TOOL:
+        # Only the last tool result of a message is forwarded
+        tool_result = results[-1] if results else {}
+        return {"role": "tool", "content": tool_result["content"], "tool_call_id": tool_result["id"]}
+
+    if tool_calls:
+        return {"role": msg.role, "content": content, "tool_calls": tool_calls}
+    return {"role": msg.role, "content": content}
+
+
+@tools_transform
+def _mistral_tools(filtered):
+    return json_fragment(filtered) if filtered else None
 
 
 class AiMistral(AiProvider):
     litellm_provider = "mistral"
     
     def prepare_request(self, messages: List[Dict]) -> Dict:
-        tools = FunctionSpace.functions.get_filtered_tools_array(self.prompt.vm.allowed_functions)
-        request = {"model": ModelManager.get_model(self.prompt.model).get_api_model_name(), "messages": messages}
-        if tools:
-            request["tools"] = tools
-            request["tool_choice"] = "auto"
-        return request
+        return {**self._request_envelope(), "messages": messages}
+
+    def _request_envelope(self) -> Dict:
+        """Request fields fixed for this prompt (model, tools, tool_choice); built once per handler."""
+        if not hasattr(self, '_envelope'):
+            envelope = {"model": ModelManager.get_model(self.prompt.model).get_api_model_name()}
+            tools = _mistral_tools(self.prompt.vm.allowed_functions)
+            if tools is not None:
+                envelope["tools"] = tools
+                envelope["tool_choice"] = "auto"
+            self._envelope = envelope
+        return self._envelope
 
     def get_api_url(self) -> str:
         return "https://api.mistral.ai/v1/chat/completions"
@@ -29,52 +67,22 @@ class AiMistral(AiProvider):
         return {"Authorization": f"Bearer {self.prompt.api_key}","Content-Type": "application/json","Accept": "application/json"}
 
     def to_ai_message(self, response: Dict) -> AiMessage:
-        choice = response.get("choices", [{}])[0].get("message", {})
+        choices = response.get("choices")
+        choice = choices[0].get("message", _EMPTY) if choices else _EMPTY
         content = []
+        _append = content.append
 
         if choice.get("content"):
-            content.append(AiTextPart(vm=self.prompt.vm, text=choice["content"]))
-
-        tool_calls = choice.get("tool_calls", [])
-        if not tool_calls:
-            tool_calls = []
+            _append(AiTextPart(vm=self.prompt.vm, text=choice["content"]))
 
-        for tool_call in tool_calls:
-            content.append(AiCall(vm=self.prompt.vm,name=tool_call["function"]["name"],arguments=tool_call["function"]["arguments"],id=tool_call["id"]))
+        for tool_call in choice.get("tool_calls") or ():
+            _append(AiCall(vm=self.prompt.vm,name=tool_call["function"]["name"],arguments=tool_call["function"]["arguments"],id=tool_call["id"]))
 
         return AiMessage(vm=self.prompt.vm, role="assistant", content=content,
                         model_name=self.prompt.model, provider=self.prompt.provider)
 
     def to_company_messages(self, messages: List[AiMessage]) -> List[Dict]:
-        mistral_messages = []
-
-        for msg in messages:
-            if msg.role == "system":
-                self.system_message = msg.content[0].text if msg.content else None
-                continue
-
-            content = []
-            tool_calls = []
-            tool_results = {}
-
-            for part in msg.content:
-                if   part.type == "text":       content.append({"type": "text", "text": part.text})
-                elif part.type == "image_url":  content.append({'type': 'image_url','image_url': {'url': f"data:{part.media_type};base64,{part.file_contents}"}})
-                elif part.type == "call":       tool_calls.append({'id': part.id,'type': 'function','function': {'name': part.name,'arguments': part.arguments}})
-                elif part.type == 'result':     tool_results = {'id': part.id,'content': part.result}
-                else:                           raise ValueError(f"Unknown part type: {part.type}")
-
-
-            if msg.role == "tool":
-                message = {"role": "tool", "content": tool_results["content"], "tool_call_id": tool_results["id"]}
-            else:
-                message = {"role": msg.role,"content": content}
-                if tool_calls:
-                    message["tool_calls"] = tool_calls
-
-            mistral_messages.append(message)
-
-        return mistral_messages
+        return [_build_mistral_message(msg) for msg in self.split_system_message(messages)]
 
     def extract_token_usage(self, response: Dict) -> tuple[int, int]:
         """Extract token usage from MistralAI API response"""
@@ -1,6 +1,5 @@
 from typing import Dict, List
 import json
-from rich.console import Console
 
 from . import FunctionSpace
 from .ModelManager import ModelManager
@@ -8,10 +7,6 @@ from .AiProvider import AiProvider
 from .AiPrompt import AiMessage, AiTextPart, AiCall
 
 
-console = Console()
-terminal_width = console.size.width
-
-
 class AiOpenAi(AiProvider):
     litellm_provider = "openai"
     
@@ -56,20 +51,22 @@ class AiOpenAi(AiProvider):
             tool_result_messages = []
 
             for part in msg.content:
-                if   part.type == "text":       content.append({"type": "text", "text": part.text})
-                elif part.type == "image_url":  content.append({'type': 'image_url','image_url': {'url': f"data:{part.media_type};base64,{part.file_contents}"}})
-                elif part.type == "call":       tool_calls.append({'id': part.id,'type': 'function','function': {'name': part.name,'arguments': json.dumps(part.arguments)}})
-                elif part.type == 'result':     tool_result_messages.append({'role': "tool", 'tool_call_id': part.id,'content': part.result})
-                else:                           raise ValueError(f"Unknown part type: {part.type}")
+                ptype = part.type
+                if   ptype == "text":       content.append({"type": "text", "text": part.text})
+                elif ptype == "image_url":  content.append({'type': 'image_url','image_url': {'url': part.data_url}})
+                elif ptype == "call":       tool_calls.append({'id': part.id,'type': 'function','function': {'name': part.name,'arguments': json.dumps(part.arguments)}})
+                elif ptype == 'result':     tool_result_messages.append({'role': "tool", 'tool_call_id': part.id,'content': part.result})
+                else:                      raise ValueError(f"Unknown part type: {ptype}")
 
             if msg.role == "tool":
                 # Add all tool result messages separately
                 openai_messages.extend(tool_result_messages)
             else:
-                message = {"role": msg.role,"content": content[0]["text"] if len(content) == 1 else content}
+                message_content = content[0]["text"] if len(content) == 1 else content
                 if tool_calls:
-                    message["tool_calls"] = tool_calls
-                openai_messages.append(message)
+                    openai_messages.append({"role": msg.role, "content": message_content, "tool_calls": tool_calls})
+                else:
+                    openai_messages.append({"role": msg.role, "content": message_content})
 
         return openai_messages
 
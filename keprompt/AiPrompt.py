@@ -7,7 +7,7 @@ from rich.console import Console
 from .config import get_config
 
 from .ModelManager import ModelManager
-from .keprompt_util import HORIZONTAL_LINE, TOP_LEFT, TOP_RIGHT, BOTTOM_LEFT, BOTTOM_RIGHT, VERTICAL
+from .keprompt_util import HORIZONTAL_LINE, TOP_LEFT, TOP_RIGHT, BOTTOM_LEFT, BOTTOM_RIGHT, VERTICAL, Role
 from .keprompt_utils import truncate_for_display
 
 # Global Variables
@@ -90,9 +90,15 @@ class AiImagePart(AiMessagePart):
     def __repr__(self) -> str:
         return f"Image(filename={self.filename!r}, media_type={self.media_type!r})"
 
+    @property
+    def data_url(self) -> str:
+        """data: URL for the image, built once and reused by every request in the tool loop."""
+        if not hasattr(self, '_data_url'):
+            self._data_url = "".join(("data:", self.media_type, ";base64,", self.file_contents))
+        return self._data_url
+
     def to_json(self) -> dict:
-        base64_data = f"data:{self.media_type};base64,{self.file_contents}"
-        return {"type": "image_url", "image_url": {"url": base64_data}}
+        return {"type": "image_url", "image_url": {"url": self.data_url}}
 
     def print_message(self) -> str:
         return f"Image(name='{self.filename}', data=...)"
@@ -120,7 +126,7 @@ class AiCall(AiMessagePart):
             "type": "tool",
             "id": self.id,
             "name": self.name,
-            "arguments": self.arguments,
+            "arguments": dict(self.arguments),  # a copy: callers may change the result
         }
 
     def print_message(self) -> str:
@@ -154,17 +160,42 @@ class AiResult(AiMessagePart):
         return f"Rtn  {self.name}(id={self.id}, content:{replaced})"
 
 
+# Saved part "type" (as written by the parts' to_json) -> rebuilds the part for vm
+_PART_DECODERS = {
+    "text": lambda vm, part: AiTextPart(vm=vm, text=part.get("text", "")),
+    "tool": lambda vm, part: AiCall(vm=vm, name=part.get("name", ""), arguments=part.get("arguments", {}),
+                                    id=part.get("id", "")),
+    "tool_result": lambda vm, part: AiResult(vm=vm, name=part.get("name", ""), id=part.get("tool_use_id", ""),
+                                             result=part.get("content", "")),
+}
+
+_ROLE_CODES = {role.name.lower(): role for role in Role}
+
+
 class AiMessage:
     def __init__(self, vm, role: str, content=None, model_name: str = None, provider: str = None, stmt_no: int = None):
         if content is None:
             content = []
         self.role = role
+        self.role_code = _ROLE_CODES.get(role)
         self.content: List[AiMessagePart] = content
         self.vm = vm
         self.model_name = model_name
         self.provider = provider
         self.stmt_no = stmt_no if stmt_no is not None else vm.ip
 
+    @classmethod
+    def from_json_list(cls, vm, messages_data: List[dict]) -> List["AiMessage"]:
+        """Rebuild messages saved with to_json(); parts of unknown type are skipped."""
+        decoders = _PART_DECODERS
+        return [
+            cls(vm=vm, role=msg.get("role", ""),
+                content=[decoders[part["type"]](vm, part) for part in msg.get("content", [])
+                         if part.get("type") in decoders],
+                model_name=msg.get("model_name"), provider=msg.get("provider"))
+            for msg in messages_data
+        ]
+
     def __str__(self) -> str:
         model_info = f", model={self.model_name}" if self.model_name else ""
         return f"Message(role={self.role}{model_info}, content={self.content})"
@@ -185,7 +216,7 @@ class AiMessage:
         # Include statement number for execution tracing
         if self.stmt_no is not None:
             result["stmt_no"] = self.stmt_no
-        return json.loads(json.dumps(result))
+        return result
 
     def print_message(self) -> str:
         content = ''
@@ -204,6 +235,7 @@ class AiPrompt:
         self.model: str = ""  # ALWAYS contains provider/model-name format
         self.model_lookup_key: str = ""  # Model identifier for ModelManager lookups
         self.api_key: str = ""
+        self.cache_enabled: bool = get_config().is_response_cache_enabled()
         self.vm = vm
 
     def print_messages(self, lbl:str):
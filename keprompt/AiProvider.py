@@ -1,31 +1,195 @@
 # AiProvider.py
 import abc
+import functools
+import hashlib
 import os
+import re
 import sys
+import time
 import json as json_module
 from typing import List, Dict, Any, TYPE_CHECKING, Optional
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-import requests
-from rich import json
 from rich.console import Console
-from rich.progress import TimeElapsedColumn, Progress
 
 from . import FunctionSpace
-from .keprompt_util import VERTICAL
+from .CustomEncoder import encode_default
+from .config import get_config
+from .json_utils import dumps_bytes, dumps_pretty, loads
+from .keprompt_util import VERTICAL, Role
 
 console = Console()
 terminal_width = console.size.width
 
 if TYPE_CHECKING:
+    import requests
     from .AiPrompt import AiMessage, AiPrompt, AiCall, AiResult
 
 
+class PartHandlers(dict):
+    """part.type -> builder table for to_company_messages; unknown part types raise `error`."""
+
+    def __init__(self, handlers: Dict[str, Any], error: type = Exception):
+        super().__init__(handlers)
+        self.error = error
+
+    def __missing__(self, part_type):
+        raise self.error(f"Unknown part type: {part_type}")
+
+
+class _Identity:
+    """Cache key for an unhashable object: equal only to itself, and holding a reference so
+    that no other object can be given its id() while the key is cached."""
+    __slots__ = ('obj',)
+
+    def __init__(self, obj):
+        self.obj = obj
+
+    def __hash__(self):
+        return id(self.obj)
+
+    def __eq__(self, other):
+        return isinstance(other, _Identity) and other.obj is self.obj
+
+
+def tools_transform(build):
+    """Memoize a provider's tools-array transform across handlers.
+
+    build(filtered_tools) runs once per (tools_array object, allowed names); a reloaded
+    FunctionSpace gets a new tools_array and so misses the cache instead of going stale.
+    """
+    @functools.lru_cache(maxsize=8)
+    def cached(tools_array: _Identity, allowed: Optional[frozenset]):
+        return build(FunctionSpace.functions.get_filtered_tools_array(allowed))
+
+    @functools.wraps(build)
+    def lookup(allowed_functions):
+        allowed = None if allowed_functions is None else frozenset(allowed_functions)
+        return cached(_Identity(FunctionSpace.functions.tools_array), allowed)
+
+    lookup.cache_clear = cached.cache_clear
+    return lookup
+
+
+@functools.cache
+def http_session() -> 'requests.Session':
+    """Process-wide HTTP session so provider calls reuse pooled keep-alive connections.
+
+    requests is imported here, on the first API call, rather than with keprompt: it is the
+    largest import in the package and most CLI commands never reach the network.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=32))
+    return session
+
+
+def _response_cache_key(url: str, body: bytes) -> str:
+    """Response cache key: a digest of the endpoint and the exact request body.
+
+    Every field that affects the answer (model, messages, tools, system prompt) is in the body.
+    """
+    return hashlib.blake2b(url.encode('utf-8') + b'\0' + body, digest_size=16).hexdigest()
+
+
+def _cached_response(key: str) -> Optional[str]:
+    """Response body cached in the chat database under key, or None.
+
+    The database is only imported once a prompt enables the cache. A database that can't be
+    read (locked, read-only) counts as a miss rather than failing the call.
+    """
+    from .database import get_db_manager
+    try:
+        return get_db_manager().get_cached_response(key)
+    except Exception:
+        return None
+
+
+def _cache_response(key: str, body: bytes) -> None:
+    """Store a response body for later runs; failing to store it doesn't fail the call."""
+    from .database import get_db_manager
+    try:
+        get_db_manager().save_cached_response(key, body.decode('utf-8'),
+                                              get_config().get('cache', 'max_entries', 1024))
+    except Exception:
+        pass
+
+
+# Rich markup tags such as [bold white] or [/]
+_RICH_MARKUP_RE = re.compile(r'\[[^\]\n]*\]')
+
+# Execution-log lines: the box-drawing markup is fixed, only the text and padding vary
+_CALL_LINE = (f"[bold white]{VERTICAL}[/][white]{{stmt_no}}[/] [cyan]{{keyword:<8}}[/] "
+              f"[green]{{call_msg:<{{width}}}}[bold white]{VERTICAL}[/][/]").format
+_TIMING_LINE = f"[white]{VERTICAL}[/]            {{content:<{{width}}}}[white]{VERTICAL}[/]".format
+
+# Upper bound on tool calls from one LLM response that run at the same time
+MAX_PARALLEL_FUNCTION_CALLS = 8
+
+# Built-ins that change files or run commands; they never overlap other tool calls
+_SEQUENTIAL_FUNCTIONS = frozenset({'writefile', 'write_base64_file', 'execcmd', 'askuser'})
+
+
+# File operations whose filename argument is always shown in full
+_FULL_FILENAME_FUNCTIONS = frozenset({'readfile', 'writefile', 'write_base64_file'})
+
+
+def _display_args(name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Format call arguments for display: truncate long strings, but preserve full filenames."""
+    keep_filename = name in _FULL_FILENAME_FUNCTIONS
+    return {
+        k: v[:47] + "..." if isinstance(v, str) and len(v) > 50 and not (keep_filename and k == 'filename') else v
+        for k, v in arguments.items()
+    }
+
+
+def _timed_function_call(name: str, call_args: Dict[str, Any]) -> tuple:
+    """Run one tool function; returns (result, elapsed_seconds, exception_or_None)."""
+    start = time.time()
+    try:
+        return FunctionSpace.functions.functions[name](**call_args), time.time() - start, None
+    except Exception as e:
+        return None, time.time() - start, e
+
+
+def _run_concurrently(calls: List[tuple]) -> list:
+    """Run (name, call_args) tool calls at the same time; returns their outcomes in call order."""
+    if len(calls) <= 1:
+        return [_timed_function_call(name, call_args) for name, call_args in calls]
+    with ThreadPoolExecutor(max_workers=min(len(calls), MAX_PARALLEL_FUNCTION_CALLS)) as pool:
+        return list(pool.map(lambda call: _timed_function_call(*call), calls))
+
+
+def _run_function_calls(calls: List[tuple]):
+    """Run (name, call_args) tool calls and yield their outcomes in call order.
+
+    Calls between side-effecting built-ins overlap. Each of those runs alone, after every
+    earlier call has finished, so e.g. a readfile sees the writefile the model asked for first.
+    """
+    outcomes = []
+    overlapping = []
+    for call in calls:
+        if call[0] in _SEQUENTIAL_FUNCTIONS:
+            outcomes += _run_concurrently(overlapping)
+            overlapping = []
+            outcomes.append(_timed_function_call(*call))
+        else:
+            overlapping.append(call)
+    outcomes += _run_concurrently(overlapping)
+    return iter(outcomes)
+
+
 class AiProvider(abc.ABC):
 
     def __init__(self, prompt: 'AiPrompt'):
         self.prompt = prompt
         self.system_prompt = None
+        # prompt.messages already converted by company_messages(), and how many of them
+        self._company_msgs_cache: List[Dict] = []
+        self._company_msgs_len = 0
 
 
 
@@ -63,6 +227,34 @@ class AiProvider(abc.ABC):
         """Calculate costs based on token usage. Returns (cost_in, cost_out)."""
         pass
 
+    def split_system_message(self, messages: List['AiMessage']) -> List['AiMessage']:
+        """Record the system prompt in self.system_message and return the other messages.
+
+        Done once up front so the per-message conversion loops need no role == "system" branch.
+        The last system message wins, as it did when each loop overwrote it in turn.
+        """
+        system_msgs = [msg for msg in messages if msg.role_code == Role.SYSTEM]
+        if not system_msgs:
+            return messages
+        system_msg = system_msgs[-1]
+        self.system_message = system_msg.content[0].text if system_msg.content else None
+        return [msg for msg in messages if msg.role_code != Role.SYSTEM]
+
+    def company_messages(self) -> List[Dict]:
+        """self.prompt.messages in provider format, converting only messages appended since the last call.
+
+        The tool loop only ever appends to the conversation, so each iteration costs O(new messages).
+        """
+        messages = self.prompt.messages
+        done = self._company_msgs_len
+        if done > len(messages):
+            # History was rewritten underneath us; start over
+            self._company_msgs_cache, done = [], 0
+        if done < len(messages):
+            self._company_msgs_cache.extend(self.to_company_messages(messages[done:]))
+            self._company_msgs_len = len(messages)
+        return self._company_msgs_cache
+
     # @abc.abstractmethod
     # def update_models(self) -> bool:
     #     """Update models from provider API. Returns True if successful."""
@@ -89,8 +281,8 @@ class AiProvider(abc.ABC):
     def load_models_from_json(cls, json_path: str) -> Dict[str, Dict]:
         """Load and validate models from JSON file"""
         try:
-            with open(json_path, 'r', encoding='utf-8') as f:
-                data = json_module.load(f)
+            with open(json_path, 'rb') as f:
+                data = loads(f.read())
             
             # Validate structure
             if not isinstance(data, dict) or 'models' not in data:
@@ -120,8 +312,8 @@ class AiProvider(abc.ABC):
         }
         
         try:
-            with open(json_path, 'w', encoding='utf-8') as f:
-                json_module.dump(data, f, indent=2, ensure_ascii=False)
+            with open(json_path, 'wb') as f:
+                f.write(dumps_pretty(data, default=encode_default))
             
             console.print(f"[green]Successfully wrote {len(models)} models to {json_path}[/green]")
             
@@ -138,26 +330,27 @@ class AiProvider(abc.ABC):
         call_id = getattr(self.prompt, '_current_call_id', None)
         
         # Format the statement line with the API call info for execution log
-        import re
-        # Clean up the label to extract statement number
-        clean_label = re.sub(r'\[.*?\]', '', label)  # Remove Rich markup
-        stmt_parts = clean_label.strip().split()
+        # Clean up the label to extract statement number (only when the logger will print it)
+        logger = self.prompt.vm.logger
+        stmt_parts = _RICH_MARKUP_RE.sub('', label).strip().split() if logger.debug_enabled else ()
         if len(stmt_parts) >= 2:
             stmt_no = stmt_parts[0].replace('│', '')
             keyword = stmt_parts[1]
             # Use the logger's print_statement method to format consistently
-            line_len = self.prompt.vm.logger.terminal_width - 14
-            header = f"[bold white]{VERTICAL}[/][white]{stmt_no}[/] [cyan]{keyword:<8}[/] "
             call_msg = f"Calling {self.prompt.provider}::{self.prompt.model}"
-            call_line = f"{call_msg:<{line_len}}[bold white]{VERTICAL}[/]"
-            self.prompt.vm.logger.log_execution(f"{header}[green]{call_line}[/]")
+            logger.log_execution(_CALL_LINE(stmt_no=stmt_no, keyword=keyword, call_msg=call_msg,
+                                            width=logger.terminal_width - 14))
+
+        # Endpoint and headers are fixed for this prompt; build them once for the whole tool loop
+        api_url = self.get_api_url()
+        headers = self.get_headers()
 
         # Iterates API calls until no function calls remain
         while do_again:
             call_count += 1
             do_again = False
 
-            company_messages = self.to_company_messages(self.prompt.messages)
+            company_messages = self.company_messages()
             
             # EXEC DEBUG: When enabled, execution details are automatically saved to conversation
             # for analysis with --view-conversation command
@@ -170,8 +363,8 @@ class AiProvider(abc.ABC):
             # Make API call with formatted label
             call_label = f"Call-{call_count:02d}"
             response = self.make_api_request(
-                url=self.get_api_url(),
-                headers=self.get_headers(),
+                url=api_url,
+                headers=headers,
                 data=request,
                 label=call_label
             )
@@ -187,18 +380,19 @@ class AiProvider(abc.ABC):
                 do_again = True
                 self.prompt.messages.append(tool_msg)
                 responses.append(tool_msg)
-                
+            
                 # EXEC DEBUG: Function results are automatically captured in conversation for analysis
-                
+            
                 # Don't log tool_response to messages.log - it's not sent to OpenAI
                 # The tool results will be included in the next "send" message
             else:
                 # No function calls - this is a final text response, show it and log it
-                # Log the entire conversation including the final response
-                all_messages = self.to_company_messages(self.prompt.messages)
-                self.prompt.vm.logger.log_message_exchange("received", all_messages, call_id)
+                # Log the entire conversation including the final response (converting
+                # the response message only when the logger will actually emit)
+                if self.prompt.vm.logger.debug_enabled:
+                    self.prompt.vm.logger.log_message_exchange("received", self.company_messages(), call_id)
                 self._display_llm_text_response(response_msg, call_label)
-                
+            
                 # EXEC DEBUG: Execution completion is automatically captured in conversation for analysis
 
         return responses
@@ -207,7 +401,6 @@ class AiProvider(abc.ABC):
     def call_functions(self, message):
         # Import here to avoid Circular Imports
         from .AiPrompt import AiResult, AiMessage, AiCall
-        import time
 
         tool_results = []
         function_call_info = []
@@ -217,6 +410,8 @@ class AiProvider(abc.ABC):
         # Persistent tool call counter across multiple call_functions() invocations
         tool_index = self.prompt.vm.vdict.get("_tool_index", 0)
 
+        # Validate and number the calls in order, then run the accepted ones
+        jobs = []
         for part in message.content:
             if not isinstance(part, AiCall): continue
             tool_index += 1
@@ -224,64 +419,44 @@ class AiProvider(abc.ABC):
             # Guard: reject function calls not in allowed list
             allowed = self.prompt.vm.allowed_functions
             if allowed is not None and part.name not in allowed:
-                error_result = f"Error: function '{part.name}' is not in the allowed functions list"
-                tool_results.append(AiResult(vm=self.prompt.vm, name=part.name, id=part.id or "", result=error_result))
+                jobs.append((part, None))
                 continue
 
             # Build call arguments, injecting delegation numbering if present
             call_args = dict(part.arguments)
             if "agent_name" in call_args:
                 call_args["agent_number"] = f"{agent_number}.{tool_index}"
+            jobs.append((part, call_args))
 
-            try:
-                # Track function execution timing
-                func_start_time = time.time()
-                result = FunctionSpace.functions.functions[part.name](**call_args)
-                func_elapsed_time = time.time() - func_start_time
+        outcomes = _run_function_calls([(part.name, call_args) for part, call_args in jobs if call_args is not None])
 
+        for part, call_args in jobs:
+            if call_args is None:
+                error_result = f"Error: function '{part.name}' is not in the allowed functions list"
+                tool_results.append(AiResult(vm=self.prompt.vm, name=part.name, id=part.id or "", result=error_result))
+                continue
+
+            result, func_elapsed_time, error = next(outcomes)
+            if error is None:
                 # Log function result using structured logging
                 self.prompt.vm.logger.log_function_call(part.name, part.arguments, result)
 
                 # Store function call info for debug output
-                # Format arguments for display (truncate long values, but preserve full filenames)
-                display_args = {}
-                for k, v in part.arguments.items():
-                    if isinstance(v, str) and len(v) > 50:
-                        # Don't truncate filename arguments for file operations
-                        if part.name in ['readfile', 'writefile', 'write_base64_file'] and k == 'filename':
-                            display_args[k] = v  # Show full filename
-                        else:
-                            display_args[k] = v[:47] + "..."
-                    else:
-                        display_args[k] = v
-                
                 function_call_info.append({
                     'name': part.name,
-                    'args': display_args,
+                    'args': _display_args(part.name, part.arguments),
                     'elapsed': func_elapsed_time
                 })
 
                 tool_results.append(AiResult(vm=self.prompt.vm, name=part.name, id=part.id or "", result=str(result)))
-            except Exception as e:
-                func_elapsed_time = time.time() - func_start_time if 'func_start_time' in locals() else 0
-                error_result = f"Error calling {str(e)}"
+            else:
+                error_result = f"Error calling {str(error)}"
                 self.prompt.vm.logger.log_function_call(part.name, part.arguments, error_result)
                 
                 # Store error function call info for debug output
-                display_args = {}
-                for k, v in part.arguments.items():
-                    if isinstance(v, str) and len(v) > 50:
-                        # Don't truncate filename arguments for file operations
-                        if part.name in ['readfile', 'writefile', 'write_base64_file'] and k == 'filename':
-                            display_args[k] = v  # Show full filename
-                        else:
-                            display_args[k] = v[:47] + "..."
-                    else:
-                        display_args[k] = v
-                
                 function_call_info.append({
                     'name': part.name,
-                    'args': display_args,
+                    'args': _display_args(part.name, part.arguments),
                     'elapsed': func_elapsed_time,
                     'error': True
                 })
@@ -329,13 +504,8 @@ class AiProvider(abc.ABC):
                 func_summary_text = ' | '.join(func_summaries)
                 enhanced_content = f"{pending['label']} {pending['timings']} --> {func_summary_text}"
                 
-                # Format properly within the table structure
-                content_len = self.prompt.vm.logger.terminal_width - 14
-                padded_content = f"{enhanced_content:<{content_len}}"
-                final_line = f"[white]{VERTICAL}[/]            {padded_content}[white]{VERTICAL}[/]"
-                
                 # Log the enhanced timing line
-                self.prompt.vm.logger.log_execution(final_line)
+                self._log_timing_line(enhanced_content)
                 
                 # Clean up
                 delattr(self.prompt, '_pending_timing_display')
@@ -355,18 +525,38 @@ class AiProvider(abc.ABC):
         # Extract and display what we're sending to the LLM
         send_summary = self._extract_send_summary(data)
 
-        # Make the API request without progress bar
-        response = requests.post(url=url, headers=headers, json=data)
-
-        if response.status_code != 200:
-            raise Exception(f"{self.prompt.provider}::{self.prompt.model} API error: {response.text}")
-
-        resp_obj = response.json()
-
-        tokens = resp_obj.get("usage", {}).get("output_tokens", 0)
-        elapsed = response.elapsed.total_seconds()
-        tokens_per_sec = tokens / elapsed if elapsed > 0 else 0
-        timings = f"Elapsed: {elapsed:.2f} seconds {tokens_per_sec:.2f} tps"
+        body = dumps_bytes(data)
+
+        # An identical request body to the same endpoint, in this or an earlier run, is answered
+        # from the cache in the chat database (opt-in), skipping both the round trip and its token cost
+        cache_key = resp_obj = None
+        if getattr(self.prompt, 'cache_enabled', False):
+            cache_key = _response_cache_key(url, body)
+            cached = _cached_response(cache_key)
+            if cached is not None:
+                resp_obj = loads(cached)
+
+        if resp_obj is None:
+            # Make the API request without progress bar; every provider sets Content-Type itself
+            response = http_session().post(url=url, headers=headers, data=body)
+
+            if response.status_code != 200:
+                raise Exception(f"{self.prompt.provider}::{self.prompt.model} API error: {response.text}")
+
+            # Parse the raw body bytes once; to_ai_message and token extraction share the result
+            resp_obj = loads(response.content)
+            if cache_key is not None:
+                _cache_response(cache_key, response.content)
+
+            # Provider-specific usage fields, read once for both the tps figure and cost tracking
+            tokens_in, tokens_out = self.extract_token_usage(resp_obj)
+            elapsed = response.elapsed.total_seconds()
+            tokens_per_sec = tokens_out / elapsed if elapsed > 0 else 0
+            timings = f"Elapsed: {elapsed:.2f} seconds {tokens_per_sec:.2f} tps"
+        else:
+            tokens_in = tokens_out = 0
+            elapsed = 0.0
+            timings = "Cached response"
 
         # Accumulate total API time on the VM
         self.prompt.vm.api_time = getattr(self.prompt.vm, 'api_time', 0.0) + elapsed
@@ -383,17 +573,7 @@ class AiProvider(abc.ABC):
             'send_summary': send_summary
         }
         
-        # Format properly within the table structure
-        content_len = self.prompt.vm.logger.terminal_width - 14  # Same as statement lines
-        padded_content = f"{timing_content:<{content_len}}"
-        final_line = f"[white]{VERTICAL}[/]            {padded_content}[white]{VERTICAL}[/]"
-        
-        self.prompt.vm.logger.log_execution(final_line)
-
-        retval = response.json()
-
-        # Use provider-specific token extraction and cost calculation
-        tokens_in, tokens_out = self.extract_token_usage(retval)
+        # Provider-specific cost calculation
         cost_in, cost_out = self.calculate_costs(tokens_in, tokens_out)
         total_cost = cost_in + cost_out
         
@@ -406,15 +586,24 @@ class AiProvider(abc.ABC):
         # Count messages sent
         msg_count = len(data.get('messages', []))
         
-        # Log enhanced llm.log entry with concise format
-        log_entry = f"{call_id}-{label}: nomsgs: {msg_count:02d}, tokens in: {tokens_in}, out: {tokens_out}, cost: ${total_cost:.6f}"
-        self.prompt.vm.logger.log_llm_call(log_entry, None)  # Don't prefix with call_id since it's in the message
+        # The response's log lines are written together, and before any of its tool calls run
+        with self.prompt.vm.logger.batch():
+            self._log_timing_line(timing_content)
+            # Log enhanced llm.log entry with concise format
+            log_entry = f"{call_id}-{label}: nomsgs: {msg_count:02d}, tokens in: {tokens_in}, out: {tokens_out}, cost: ${total_cost:.6f}"
+            self.prompt.vm.logger.log_llm_call(log_entry, None)  # Don't prefix with call_id since it's in the message
 
         # Update token counts
         self.prompt.toks_in += tokens_in
         self.prompt.toks_out += tokens_out
 
-        return retval
+        return resp_obj
+
+    def _log_timing_line(self, content: str):
+        """Log an indented timing line padded to the execution table, if the logger will print it."""
+        logger = self.prompt.vm.logger
+        if logger.debug_enabled:
+            logger.log_execution(_TIMING_LINE(content=content, width=logger.terminal_width - 14))
 
     def _extract_send_summary(self, request_data: Dict) -> str:
         """Extract a summary of what we're sending to the LLM"""
@@ -512,13 +701,8 @@ class AiProvider(abc.ABC):
                 # Create simplified timing line with LLM response
                 enhanced_content = f"{pending['label']} --> Return text('{display_text}')"
                 
-                # Format properly within the table structure
-                content_len = self.prompt.vm.logger.terminal_width - 14
-                padded_content = f"{enhanced_content:<{content_len}}"
-                final_line = f"[white]{VERTICAL}[/]            {padded_content}[white]{VERTICAL}[/]"
-                
                 # Log the enhanced timing line
-                self.prompt.vm.logger.log_execution(final_line)
+                self._log_timing_line(enhanced_content)
                 
                 # Clean up
                 delattr(self.prompt, '_pending_timing_display')
@@ -1,15 +1,11 @@
 from typing import Dict, List
 import json
-from rich.console import Console
 
 from . import FunctionSpace
 from .ModelManager import ModelManager
 from .AiProvider import AiProvider
 from .AiPrompt import AiMessage, AiTextPart, AiCall
 
-console = Console()
-terminal_width = console.size.width
-
 
 class AiXai(AiProvider):
     litellm_provider = "xai"
@@ -54,11 +50,12 @@ class AiXai(AiProvider):
             tool_results = {}
 
             for part in msg.content:
-                if   part.type == "text":       content.append({"type": "text", "text": part.text})
-                elif part.type == "image_url":  content.append({'type': 'image_url','image_url': {'url': f"data:{part.media_type};base64,{part.file_contents}"}})
-                elif part.type == "call":       tool_calls.append({'id': part.id,'type': 'function','function': {'name': part.name,'arguments': json.dumps(part.arguments)}})
-                elif part.type == 'result':     tool_results = {'role':'tool', 'content': part.result, 'tool_call_id': part.id}
-                else:                           raise ValueError(f"Unknown part type: {part.type}")
+                ptype = part.type
+                if   ptype == "text":       content.append({"type": "text", "text": part.text})
+                elif ptype == "image_url":  content.append({'type': 'image_url','image_url': {'url': part.data_url}})
+                elif ptype == "call":       tool_calls.append({'id': part.id,'type': 'function','function': {'name': part.name,'arguments': json.dumps(part.arguments)}})
+                elif ptype == 'result':     tool_results = {'role':'tool', 'content': part.result, 'tool_call_id': part.id}
+                else:                      raise ValueError(f"Unknown part type: {ptype}")
 
             if msg.role == "tool":
                 message = tool_results
@@ -1,31 +1,62 @@
 import json
+import sys
+from dataclasses import asdict, is_dataclass
 from decimal import Decimal
 from datetime import datetime, date
 
 
+def _encode_instance_dict(obj):
+    """Fallback: try __dict__."""
+    try:
+        return vars(obj)
+    except TypeError:
+        raise TypeError(f"Object of type {obj.__class__.__name__} is not JSON serializable") from None
+
+
+def _encode_peewee_row(obj):
+    # The encoder walks the row's fields itself and comes back here for any
+    # Decimal or date values inside
+    return obj.__data__
+
+
+# type -> encoder. Seeded with the base types; subclasses (every Peewee model class) are
+# resolved through their MRO on first sight and memoized, so later lookups are one dict hit
+_HANDLERS = {
+    # Decimal (used in cost fields)
+    Decimal: float,
+    datetime: datetime.isoformat,
+    date: date.isoformat,
+}
+
+
+def _resolve_handler(cls):
+    # A Peewee row can only exist once peewee is imported; registering its Model
+    # here keeps the import (and its cost) off paths that never touch the database
+    peewee = sys.modules.get('peewee')
+    if peewee is not None:
+        _HANDLERS.setdefault(peewee.Model, _encode_peewee_row)
+    for base in cls.__mro__:
+        handler = _HANDLERS.get(base)
+        if handler is not None:
+            break
+    else:
+        # Dataclasses (AiModel uses __slots__, so it has no __dict__)
+        handler = asdict if is_dataclass(cls) else _encode_instance_dict
+    _HANDLERS[cls] = handler
+    return handler
+
+
+def encode_default(obj):
+    """Fallback for objects json can't encode: Peewee models, Decimal, dates.
+
+    Used by CustomEncoder and as the default= hook of json_utils.dumps_pretty
+    (orjson encodes dates and dataclasses natively and never calls it for those).
+    """
+    cls = type(obj)
+    handler = _HANDLERS.get(cls) or _resolve_handler(cls)
+    return handler(obj)
+
+
 class CustomEncoder(json.JSONEncoder):
     def default(self, obj):
-        # Handle Peewee Model instances
-        if hasattr(obj, '__data__'):  # Peewee models have __data__ attribute
-            # Get the raw data dictionary and recursively process it
-            data = obj.__data__
-            result = {}
-            for key, value in data.items():
-                # Recursively handle nested objects
-                if isinstance(value, Decimal):
-                    result[key] = float(value)
-                elif isinstance(value, (datetime, date)):
-                    result[key] = value.isoformat()
-                else:
-                    result[key] = value
-            return result
-        # Handle Decimal (used in cost fields)
-        if isinstance(obj, Decimal):
-            return float(obj)
-        # Handle datetime objects
-        if isinstance(obj, (datetime, date)):
-            return obj.isoformat()
-        # Fallback: try __dict__
-        if hasattr(obj, '__dict__'):
-            return obj.__dict__
-        return json.JSONEncoder.default(self, obj)
+        return encode_default(obj)
@@ -8,7 +8,9 @@ from rich.table import Table
 
 from . import CustomEncoder
 from .AiProvider import AiProvider
-from dataclasses import dataclass, field, asdict
+from .json_utils import loads
+from dataclasses import dataclass, field, fields, asdict
+from operator import attrgetter
 from typing import Dict, Any
 from pathlib import Path
 
@@ -16,7 +18,7 @@ from .terminal_output import terminal_output
 
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class AiModel:
     # Core identification (required fields)
     provider: str           # API service (OpenAI, Anthropic, XAI, OpenRouter)
@@ -142,8 +144,32 @@ class AiModel:
         )
 
     def to_dict(self) -> dict:
-        """Convert Prompt to dictionary for JSON serialization."""
-        return asdict(self)
+        """Convert to a dictionary for JSON serialization (same result as asdict, without its deep copy)."""
+        data = dict(zip(_AIMODEL_FIELDS, _aimodel_values(self)))
+        data["supports"] = dict(self.supports)
+        return data
+
+
+# Field names in declaration order, and one C-level getter for all their values
+_AIMODEL_FIELDS = tuple(f.name for f in fields(AiModel))
+_aimodel_values = attrgetter(*_AIMODEL_FIELDS)
+_model_name = attrgetter("model")
+
+
+def _model_row(model: AiModel) -> tuple:
+    """Cells of one 'models get --pretty' table row."""
+    max_in = model.max_input_tokens or model.max_tokens
+    max_out = model.max_output_tokens or model.max_tokens
+    supports = model.supports
+    return (
+        model.model,
+        f"{max_in:,}" if max_in else "",
+        f"{max_out:,}" if max_out else "",
+        f"{model.input_cost * 1_000_000:06.4f}",
+        f"{model.output_cost * 1_000_000:06.4f}",
+        "Text+Vision" if supports.get("vision", False) else "Text",
+        "Yes" if supports.get("function_calling", False) else "No",
+    )
 
 
 
@@ -152,6 +178,7 @@ class ModelManager:
     handlers: Dict[str, Type['AiProvider']] = {}
     models: Dict[str, AiModel] = {}
     _initialized:bool = False
+    _db_stamp: tuple = None   # (st_mtime_ns, st_size) of the LiteLLM database last parsed
 
     def __init__(self, args: argparse.Namespace):
         self.args = args
@@ -197,13 +224,16 @@ class ModelManager:
         # Don't load models during registration - wait until they're needed
 
     @classmethod
-    def _load_all_models(cls) -> None:
-        """Load models from LiteLLM database, filtering by registered provider litellm_provider"""
+    def _load_all_models(cls, force: bool = False) -> None:
+        """Load models from LiteLLM database, filtering by registered provider litellm_provider
+
+        Loads once per process; force=True re-checks the database and re-parses it only if
+        its mtime or size changed since the last load.
+        """
         import os
-        import json
         import time
 
-        if cls._initialized:
+        if cls._initialized and not force:
             return
 
         start_time = time.time()
@@ -215,19 +245,27 @@ class ModelManager:
             terminal_output.print(f"Warning: LiteLLM database not found at {litellm_db_path}", markup=False)
             return
         
+        stat = litellm_db_path.stat()
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if stamp == cls._db_stamp:
+            cls._initialized = True
+            return
+
         try:
             # Build a map of litellm_provider to handler
-            providers = []
+            providers = set()
             for provider_name, handler_class in cls.handlers.items():
                 if hasattr(handler_class, 'litellm_provider'):
                     if handler_class.litellm_provider == 'bedrock': continue
-                    providers.append(handler_class.litellm_provider)
+                    providers.add(handler_class.litellm_provider)
 
-            with open(litellm_db_path, 'r') as f:
-                litellm_data = json.load(f)
+            # Parsed from raw bytes, and only on first lookup, never at provider import
+            litellm_data = loads(litellm_db_path.read_bytes())
             
-            # Load models for registered providers only
+            # Load models for registered providers only; most catalog entries are
+            # rejected here, so the cheap checks come before any string building
             model_data = {}
+            from_litellm = AiModel.from_litellm_dict
             for model_name, model_info in litellm_data.items():
                 litellm_provider = model_info.get("litellm_provider", "")
 
@@ -235,20 +273,16 @@ class ModelManager:
                 if litellm_provider not in providers:
                     continue
 
+                # Skip non-chat models (image generation, etc.)
+                if model_info.get("mode", "chat") != "chat":
+                    continue
+
                 # WOrkaround for missing provider in model name
-                if model_name.startswith(litellm_provider):
-                    pass
-                else:
+                if not model_name.startswith(litellm_provider):
                     model_name = f"{litellm_provider}/{model_name}"
 
-
-                # Skip non-chat models (image generation, etc.)
-                mode = model_info.get("mode", "chat")
-                if mode != "chat":
-                    continue
-                    
                 try:
-                    model = AiModel.from_litellm_dict(model_name, model_info)
+                    model = from_litellm(model_name, model_info)
                     # The model.model field now contains provider/model-name, use it as key
                     model_data[model.model] = model
                 except Exception as e:
@@ -256,6 +290,7 @@ class ModelManager:
                     pass
 
             cls.register_models_from_dict(model_data)
+            cls._db_stamp = stamp
             cls._initialized = True
             
             elapsed = time.time() - start_time
@@ -291,8 +326,7 @@ class ModelManager:
 
     @classmethod
     def register_models_from_dict(cls, model_definitions: Dict[str, Dict[str, Any]]) -> None:
-        for name, model in model_definitions.items():
-            cls.models[name] = model
+        cls.models.update(model_definitions)
 
 
     @classmethod
@@ -319,15 +353,16 @@ class ModelManager:
             # self._load_all_models()
             models = []
 
-            name_filter = getattr(self.args, "name", None)
-            provider_filter = getattr(self.args, "provider", None)
-            company_filter = getattr(self.args, "company", None)
+            # Read and lower-case the filters once, not once per catalog model
+            name_filter = (getattr(self.args, "name", None) or "").lower()
+            provider_filter = (getattr(self.args, "provider", None) or "").lower()
+            company_filter = (getattr(self.args, "company", None) or "").lower()
 
             # Filter models based on patterns
             for name, model in self.models.items():
-                if name_filter and name_filter.lower() not in name.lower(): continue
-                if provider_filter and provider_filter.lower() != model.provider.lower(): continue
-                if company_filter and company_filter.lower() != model.company.lower(): continue
+                if name_filter and name_filter not in name.lower(): continue
+                if provider_filter and provider_filter != model.provider.lower(): continue
+                if company_filter and company_filter != model.company.lower(): continue
 
                 models.append(model)
 
@@ -357,9 +392,8 @@ class ModelManager:
                 
                 update_models(target=provider_filter)
                 
-                # Reload models after update
-                self._initialized = False
-                self._load_all_models()
+                # Reload models after update (skipped if the database did not change)
+                self._load_all_models(force=True)
                 
                 message = "Successfully updated model database from LiteLLM"
                 if provider_filter:
@@ -426,20 +460,8 @@ class ModelManager:
             table.add_column("Input", style="blue", no_wrap=True)
             table.add_column("Functions", style="yellow", no_wrap=True)
 
-            for model in sorted(models, key=lambda x: x.model):
-
-                max_in = model.max_input_tokens or model.max_tokens
-                max_out = model.max_output_tokens or model.max_tokens
-
-                table.add_row(
-                    model.model,
-                    f"{max_in:,}" if max_in else "",
-                    f"{max_out:,}" if max_out else "",
-                    f"{model.input_cost * 1_000_000:06.4f}",
-                    f"{model.output_cost * 1_000_000:06.4f}",
-                    "Text+Vision" if model.supports.get("vision", False) else "Text",
-                    "Yes" if model.supports.get("function_calling", False) else "No"
-                )
+            for model in sorted(models, key=_model_name):
+                table.add_row(*_model_row(model))
 
             return table
 
@@ -3,29 +3,56 @@ JSON API module for keprompt - provides REST-style commands that return structur
 This module implements the core data layer that separates business logic from presentation.
 """
 import argparse
-# Import the global output format flag
-import os
+import importlib
+from collections import Counter
 from datetime import datetime
-from typing import Dict, Any
-
-from rich.table import Table
+from typing import Dict, Any, TypedDict, Union
 
 from . import FunctionSpace
-from .ModelManager import ModelManager
-from .Prompt import PromptManager
-from .database import DatabaseManager
-from .chat_manager import ChatManager
-from .db_cli import init_database, delete_database, truncate_database
 
-from rich.console import Console
+# Managers are imported only when a command dispatches to them (see _COMMAND_MANAGERS): the
+# database and chat modules pull in peewee and the textual chat viewer, which most commands never need
+
+
+class _SuccessResponseBase(TypedDict):
+    success: bool
+    data: Any
+    timestamp: str
+
+
+class SuccessResponse(_SuccessResponseBase, total=False):
+    """Envelope every manager's execute() returns on success; object_type selects the pretty formatter."""
+    object_type: str
+
+
+class _ErrorResponseBase(TypedDict):
+    success: bool
+    error: str
+    timestamp: str
+
+
+class ErrorResponse(_ErrorResponseBase, total=False):
+    """Envelope returned on failure; handle_json_command adds the raising file:line as source."""
+    source: str
+
+
+ApiResponse = Union[SuccessResponse, ErrorResponse]
 
-console = Console()
 
+def _ok(data: Any, **extra) -> SuccessResponse:
+    """Success envelope for data; extra adds keys such as object_type."""
+    return {"success": True, **extra, "data": data, "timestamp": datetime.now().isoformat()}
 
 
+def _err(error: str, **extra) -> ErrorResponse:
+    """Error envelope for error; extra adds keys such as source."""
+    return {"success": False, **extra, "error": error, "timestamp": datetime.now().isoformat()}
+
 
 class ProviderManager():
     """Handles provider commands"""
+
+    __slots__ = ('args',)
     
     @classmethod
     def register_cli(cls, parent_subparsers: argparse._SubParsersAction, parent_parser: argparse.ArgumentParser) -> None:
@@ -46,39 +73,29 @@ class ProviderManager():
     def __init__(self, args: argparse.Namespace):
         self.args = args
 
-    def execute(self):
+    def execute(self) -> ApiResponse:
         cmd = self.args.provider_command
 
         if cmd in ('get', 'list', 'show'):
+            from .ModelManager import ModelManager
+
             # Ensure models are loaded
             ModelManager._load_all_models()
 
             # Get unique providers with their model counts
-            providers = {}
-            for model in ModelManager.models.values():
-                provider = model.provider
-                if provider not in providers:
-                    providers[provider] = {
-                        "name": provider,
-                        "models_count": 0
-                    }
-                providers[provider]["models_count"] += 1
-
-            provider_list = sorted(providers.values(), key=lambda x: x["name"])
+            counts = Counter(model.provider for model in ModelManager.models.values())
+            provider_list = [{"name": name, "models_count": count} for name, count in sorted(counts.items())]
 
             # Return JSON with object_type for OutputFormatter
-            return {
-                "success": True,
-                "object_type": "provider_list",
-                "data": provider_list,
-                "timestamp": datetime.now().isoformat()
-            }
+            return _ok(provider_list, object_type="provider_list")
 
-        return {"success": False, "error": f"Unknown provider command: {cmd}", "timestamp": datetime.now().isoformat()}
+        return _err(f"Unknown provider command: {cmd}")
 
 
 class FunctionManager():
     """Handles function commands """
+
+    __slots__ = ('args',)
     
     @classmethod
     def register_cli(cls, parent_subparsers: argparse._SubParsersAction, parent_parser: argparse.ArgumentParser) -> None:
@@ -105,41 +122,53 @@ class FunctionManager():
         self.args = args
 
 
-    def execute(self):
+    def execute(self) -> SuccessResponse:
         cmd = self.args.functions_command
 
         # Return JSON data - OutputFormatter will handle pretty display
-        return {
-            "success": True,
-            "object_type": "function_list",
-            "data": FunctionSpace.functions.tools_array,
-            "timestamp": datetime.now().isoformat()
-        }
+        return _ok(FunctionSpace.functions.tools_array, object_type="function_list")
+
+
+# command (singular/plural/alias) -> (module, manager class); modules import on dispatch.
+# Groups are listed in the order the CLI registers (and --help shows) them
+_COMMAND_MANAGERS = {
+    **dict.fromkeys(('prompt', 'prompts'), ('.Prompt', 'PromptManager')),
+    **dict.fromkeys(('models', 'model'), ('.ModelManager', 'ModelManager')),
+    **dict.fromkeys(('chat', 'chats', 'conversation', 'conversations'), ('.chat_manager', 'ChatManager')),
+    **dict.fromkeys(('database', 'databases'), ('.database', 'DatabaseManager')),
+    **dict.fromkeys(('provider', 'providers'), ('.api', 'ProviderManager')),
+    **dict.fromkeys(('functions', 'function'), ('.api', 'FunctionManager')),
+    **dict.fromkeys(('init', 'workspace'), ('.workspace_manager', 'WorkspaceManager')),
+}
 
 
-def handle_json_command(args: argparse.Namespace) -> dict[str, Any]:
+def get_manager_class(command: str):
+    """Import and return the manager class that handles command, or None if it is unknown."""
+    manager = _COMMAND_MANAGERS.get(command)
+    if manager is None:
+        return None
+    module_name, class_name = manager
+    return getattr(importlib.import_module(module_name, __package__), class_name)
+
+
+def get_cli_manager_classes(command: str = None) -> list:
+    """Manager classes whose CLI to register: only command's when it is known, else all of them."""
+    if command in _COMMAND_MANAGERS:
+        return [get_manager_class(command)]
+    return [getattr(importlib.import_module(module_name, __package__), class_name)
+            for module_name, class_name in dict.fromkeys(_COMMAND_MANAGERS.values())]
+
+
+def handle_json_command(args: argparse.Namespace) -> ApiResponse:
     """Handle JSON API commands and return exit code"""
     try:
         command = args.command
 
         # Normalize singular/plural and route to appropriate manager
-        if command in ('prompt', 'prompts'):
-            cmd_manager = PromptManager(args)
-        elif command in ('models', 'model'):
-            cmd_manager = ModelManager(args)
-        elif command in ('provider', 'providers'):
-            cmd_manager = ProviderManager(args)
-        elif command in ('functions', 'function'):
-            cmd_manager = FunctionManager(args)
-        elif command in ('chat', 'chats', 'conversation', 'conversations'):
-            cmd_manager = ChatManager(args)
-        elif command in ('database', 'databases'):
-            cmd_manager = DatabaseManager(args)
-        elif command in ('init', 'workspace'):
-            from .workspace_manager import WorkspaceManager
-            cmd_manager = WorkspaceManager(args)
-        else:
+        manager_class = get_manager_class(command)
+        if manager_class is None:
             raise Exception(f"Unknown Object '{command}'")
+        cmd_manager = manager_class(args)
 
         response = cmd_manager.execute()
         # here we need to work out print format...
@@ -151,13 +180,12 @@ def handle_json_command(args: argparse.Namespace) -> dict[str, Any]:
         src = ''
         lno = 0
 
-        # Extract source and line info from traceback if available
-        if hasattr(e, '__traceback__'):
-            tb = e.__traceback__
-            while tb:
-                src = tb.tb_frame.f_code.co_filename
-                lno = tb.tb_lineno
+        # Extract source and line info of the innermost frame from the traceback, if any
+        tb = e.__traceback__
+        if tb is not None:
+            while tb.tb_next is not None:
                 tb = tb.tb_next
+            src = tb.tb_frame.f_code.co_filename
+            lno = tb.tb_lineno
 
-        response = {'success': False, 'source': f'{src}:{lno}', 'error': f'Command failed: {etext}', 'timestamp': datetime.now().isoformat()}
-        return response
+        return _err(f'Command failed: {etext}', source=f'{src}:{lno}')
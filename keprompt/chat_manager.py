@@ -8,25 +8,92 @@ as a thin compatibility shim importing this module.
 from __future__ import annotations
 
 import argparse
+import functools
 import json
 import os
 import socket
 import subprocess
+import time
 from datetime import datetime
+from operator import attrgetter
+from pathlib import Path
 from typing import Dict, Any, Optional, List
 
 from rich.markdown import Markdown
 from rich.table import Table
 
-from .AiPrompt import AiTextPart
-from .database import get_db_manager, Chat, CostTracking
+from .database import get_db_manager
 from .ModelManager import ModelManager
 from .config import get_config
+from .json_utils import dumps, loads
 from .AiPrompt import AiCall, AiResult, AiMessage
 from .keprompt_logger import LogMode, StandardLogger
 from .keprompt_vm import VM, VMExecutionError
 
 
+@functools.cache
+def _hostname() -> str:
+    """Host name recorded with saved chats (looked up once per process)."""
+    return socket.gethostname()
+
+
+def _read_head_commit(git_dir: Path) -> Optional[str]:
+    """Commit hash HEAD points to, read from git_dir's files (None if it can't be resolved that way)."""
+    try:
+        head = (git_dir / "HEAD").read_text().strip()
+        if not head.startswith("ref: "):
+            return head  # Detached HEAD
+        ref = head[len("ref: "):]
+        ref_file = git_dir / ref
+        if ref_file.is_file():
+            return ref_file.read_text().strip()
+        for line in (git_dir / "packed-refs").read_text().splitlines():
+            if line.endswith(f" {ref}"):
+                return line.split(" ", 1)[0]
+    except OSError:
+        pass
+    return None
+
+
+@functools.cache
+def _git_commit() -> Optional[str]:
+    """Short hash of the current git commit, if any (looked up once per process, on first save).
+
+    A plain .git directory is read directly; git itself only runs for layouts it alone
+    resolves reliably (worktrees, submodules, GIT_DIR, unborn or unusual refs).
+    """
+    if "GIT_DIR" not in os.environ:
+        cwd = Path.cwd()
+        for directory in (cwd, *cwd.parents):
+            git_dir = directory / ".git"
+            if git_dir.is_dir():
+                commit = _read_head_commit(git_dir)
+                if commit:
+                    return commit[:8]  # Short hash
+                break
+            if git_dir.exists():
+                break  # A .git file (worktree, submodule): let git follow it
+        else:
+            return None  # Not inside a repository
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            timeout=2,
+        )
+        if result.returncode == 0:
+            return result.stdout.strip()[:8]  # Short hash
+    except (subprocess.TimeoutExpired, FileNotFoundError):
+        pass
+    return None
+
+
+# Chat row fields a chat list entry is built from, read in one call per row
+_chat_list_values = attrgetter("chat_id", "created_timestamp", "prompt_name", "prompt_version", "prompt_filename",
+                               "total_cost", "total_api_calls", "first_question")
+
+
 class ChatManager:
     """High-level Chat operations """
 
@@ -108,23 +175,6 @@ class ChatManager:
     def __init__(self, args: argparse.Namespace = None):
         self.args = args
         self.db_manager = get_db_manager()
-        self._hostname = socket.gethostname()
-        self._git_commit = self._get_git_commit()
-
-    def _get_git_commit(self) -> Optional[str]:
-        """Get current git commit hash if available."""
-        try:
-            result = subprocess.run(
-                ["git", "rev-parse", "HEAD"],
-                capture_output=True,
-                text=True,
-                timeout=2,
-            )
-            if result.returncode == 0:
-                return result.stdout.strip()[:8]  # Short hash
-        except (subprocess.TimeoutExpired, FileNotFoundError):
-            pass
-        return None
 
     # --------------------------------------------------------------------- #
     #  Serialisation helpers
@@ -155,24 +205,6 @@ class ChatManager:
                     raise ValueError(f"--set '{arg}' missing value. Use --set {arg}=value or --set {arg} value")
         return pairs
 
-    def _make_serializable(self, obj):
-        """Make an object JSON serializable."""
-        if isinstance(obj, dict):
-            return {k: self._make_serializable(v) for k, v in obj.items()}
-        if isinstance(obj, list):
-            return [self._make_serializable(i) for i in obj]
-        if hasattr(obj, "__class__") and obj.__class__.__name__ == "AiModel":
-            return str(obj)
-        if hasattr(obj, "__class__") and "Path" in obj.__class__.__name__:
-            return str(obj)
-        if isinstance(obj, (str, int, float, bool, type(None))):
-            return obj
-        try:
-            json.dumps(obj)
-            return obj
-        except (TypeError, ValueError):
-            return str(obj)
-
     # --------------------------------------------------------------------- #
     #  Persistence helpers
     # --------------------------------------------------------------------- #
@@ -180,7 +212,8 @@ class ChatManager:
         """Save chat from VM state. If error is provided, it is stored in vm_state."""
 
         # Prepare chat data
-        messages_json = json.dumps(vm.prompt.to_json())
+        messages = vm.prompt.to_json()
+        messages_json = dumps(messages)
 
         # Prepare VM state
         vm_state = {
@@ -208,19 +241,19 @@ class ChatManager:
             vm_state["error"] = error
         else:
             vm_state["status"] = "ok"
-        vm_state_json = json.dumps(vm_state)
+        vm_state_json = dumps(vm_state)
 
-        # Prepare variables (make serializable)
-        serializable_vars = self._make_variables_serializable(vm.vdict)
-        variables_json = json.dumps(serializable_vars)
+        # Prepare variables: values JSON can't encode (AiModel, Path, ...) are stored as str()
+        variables_json = dumps(vm.vdict, default=str)
 
         # Prepare metadata
         metadata = {
             "prompt_name": vm.prompt_name or "Unknown",
             "prompt_version": vm.prompt_version or "0.0.0",
             "prompt_filename": vm.filename,
-            "hostname": self._hostname,
-            "git_commit": self._git_commit,
+            "first_question": self._first_question(messages),
+            "hostname": _hostname(),
+            "git_commit": _git_commit(),
             "total_api_calls": vm.interaction_no,
             "total_tokens_in": vm.toks_in,
             "total_tokens_out": vm.toks_out,
@@ -228,24 +261,20 @@ class ChatManager:
         }
 
         # Prepare statements
-        statements_json = json.dumps(vm.serialize_statements())
-
-        # Save to database
-        self.db_manager.save_chat(
-            chat_id=vm.prompt_uuid,
-            chat_name="",  # kept for compatibility
-            messages_json=messages_json,
-            vm_state_json=vm_state_json,
-            variables_json=variables_json,
-            statements_json=statements_json,
-            **metadata,
-        )
-
-        # Save any pending cost records
-        for msg_no, cost_data in vm.pending_costs:
-            self.db_manager.save_cost_tracking(
-                chat_id=vm.prompt_uuid, msg_no=msg_no, **cost_data
+        statements_json = dumps(vm.serialize_statements())
+
+        # Save the chat and any pending cost records in one transaction (one commit)
+        with self.db_manager.db.atomic():
+            self.db_manager.save_chat(
+                chat_id=vm.prompt_uuid,
+                chat_name="",  # kept for compatibility
+                messages_json=messages_json,
+                vm_state_json=vm_state_json,
+                variables_json=variables_json,
+                statements_json=statements_json,
+                **metadata,
             )
+            self.db_manager.save_cost_tracking_batch(vm.prompt_uuid, vm.pending_costs)
         vm.pending_costs = []  # Clear after saving
 
         return vm.prompt_uuid
@@ -273,8 +302,8 @@ class ChatManager:
         # Preserve identity continuity
         vm.prompt_uuid = chat_id
 
-        # Restore VM state from database
-        vm_state = json.loads(chat.vm_state_json) if chat.vm_state_json else {}
+        # Restore VM state from database (get_chat has already parsed the JSON columns)
+        vm_state = chat_db["vm_state"]
         vm.ip = vm_state.get("ip", 0)
         vm.model_name = vm_state.get("model_name", "")
         vm.provider = vm_state.get("provider", vm.provider)
@@ -322,48 +351,7 @@ class ChatManager:
             vm.model = None
 
         # Restore messages (universal format)
-        vm.prompt.messages = []
-
-        for msg_data in messages_data:
-            role = msg_data.get("role", "")
-            content_data = msg_data.get("content", [])
-            # Extract model metadata if present (for assistant messages)
-            model_name = msg_data.get("model_name")
-            provider = msg_data.get("provider")
-
-            # Reconstruct message parts
-            content_parts = []
-            for part_data in content_data:
-                part_type = part_data.get("type", "")
-
-                if part_type == "text":
-                    content_parts.append(
-                        AiTextPart(vm=vm, text=part_data.get("text", ""))
-                    )
-                elif part_type == "tool":
-                    content_parts.append(
-                        AiCall(
-                            vm=vm,
-                            name=part_data.get("name", ""),
-                            arguments=part_data.get("arguments", {}),
-                            id=part_data.get("id", ""),
-                        )
-                    )
-                elif part_type == "tool_result":
-                    content_parts.append(
-                        AiResult(
-                            vm=vm,
-                            name=part_data.get("name", ""),
-                            id=part_data.get("tool_use_id", ""),
-                            result=part_data.get("content", ""),
-                        )
-                    )
-
-            # Add message to prompt with model metadata
-            vm.prompt.messages.append(
-                AiMessage(vm=vm, role=role, content=content_parts,
-                         model_name=model_name, provider=provider)
-            )
+        vm.prompt.messages = AiMessage.from_json_list(vm, messages_data)
 
         # Restore variables
         vm.vdict.update(variables_data)
@@ -373,13 +361,8 @@ class ChatManager:
             vm.filename = chat.prompt_filename
 
         # Restore statements if available
-        statements_json = (
-            chat.statements_json
-            if hasattr(chat, "statements_json")
-            else None
-        )
-        if statements_json:
-            statements_data = json.loads(statements_json)
+        statements_data = chat_db["statements"]
+        if statements_data:
             vm.deserialize_statements(statements_data)
 
         # Restore logging configuration from vm_state
@@ -407,63 +390,54 @@ class ChatManager:
         """Get chat with all related data."""
         return self.db_manager.get_chat_with_costs(chat_id)
 
+    @staticmethod
+    def _first_question(messages: list) -> str:
+        """Text of the first user message in messages (as produced by prompt.to_json())."""
+        for msg in messages:
+            if msg.get("role") == "user":
+                for part in msg.get("content", []):
+                    if part.get("type") == "text" and part.get("text"):
+                        return part["text"]
+        return ""
+
     @staticmethod
     def _extract_first_question(messages_json: str) -> str:
         """Extract the text of the first user message from messages_json."""
         try:
-            messages = json.loads(messages_json) if messages_json else []
-            for msg in messages:
-                if msg.get("role") == "user":
-                    for part in msg.get("content", []):
-                        if part.get("type") == "text" and part.get("text"):
-                            return part["text"]
-        except (json.JSONDecodeError, TypeError):
-            pass
-        return ""
+            return ChatManager._first_question(loads(messages_json) if messages_json else [])
+        except (json.JSONDecodeError, TypeError, AttributeError):
+            return ""
 
     def list_chats(self, limit: int = 100) -> list:
         """List recent chats."""
+        return list(self.iter_chats(limit=limit))
+
+    def iter_chats(self, limit: int = 100):
+        """Yield recent chats' summary dicts one at a time (see list_chats)."""
         chats = self.db_manager.list_chats(limit=limit)
-        result = []
+        # Actual model and provider used (most recent call) and total elapsed time, for all chats at once
+        try:
+            summaries = self.db_manager.get_chat_call_summaries([conv.chat_id for conv in chats])
+        except Exception:
+            summaries = {}
         for conv in chats:
-            # Get actual model and provider used from cost_tracking records (most recent call)
-            # Also sum up total elapsed time
-            model_name = ""
-            provider = ""
-            total_elapsed_time = 0.0
-            try:
-                cost_records = list(
-                    CostTracking.select()
-                    .where(CostTracking.chat_id == conv.chat_id)
-                    .order_by(CostTracking.msg_no.desc())
-                )
-                if cost_records:
-                    # Get model and provider from most recent
-                    model_name = cost_records[0].model
-                    provider = cost_records[0].provider
-                    # Sum elapsed time from all records
-                    total_elapsed_time = sum(float(rec.elapsed_time) for rec in cost_records)
-            except Exception:
-                pass
-
-            result.append({
-                "chat_id": conv.chat_id,
-                "created_timestamp": (
-                    conv.created_timestamp.isoformat()
-                    if conv.created_timestamp
-                    else ""
-                ),
-                "prompt_name": conv.prompt_name,
-                "prompt_version": conv.prompt_version,
-                "prompt_filename": conv.prompt_filename,
-                "total_cost": float(conv.total_cost),
-                "total_api_calls": conv.total_api_calls,
+            (chat_id, created, prompt_name, prompt_version, prompt_filename,
+             total_cost, total_api_calls, first_question) = _chat_list_values(conv)
+            model_name, provider, total_elapsed_time = summaries.get(chat_id, ("", "", 0.0))
+
+            yield {
+                "chat_id": chat_id,
+                "created_timestamp": created.isoformat() if created else "",
+                "prompt_name": prompt_name,
+                "prompt_version": prompt_version,
+                "prompt_filename": prompt_filename,
+                "total_cost": float(total_cost),
+                "total_api_calls": total_api_calls,
                 "provider": provider,
                 "model": model_name,
                 "total_time": total_elapsed_time,
-                "first_question": self._extract_first_question(conv.messages_json),
-            })
-        return result
+                "first_question": first_question or "",
+            }
 
     def delete_chat(self, chat_id: str) -> bool:
         """Delete chat and all related data."""
@@ -483,11 +457,9 @@ class ChatManager:
 
         # Pretty output: return Rich tables when requested
         if getattr(self.args, "pretty", False):
-            from rich.console import Console
             # Only keep pretty formatting for chat list (table makes sense)
             # For single chat details, return JSON for OutputFormatter to handle
             if not chat_id:
-                chats = self.list_chats(limit=limit or 100)
                 table = Table(title="Recent Chats")
                 table.add_column("Chat ID", style="cyan", no_wrap=True)
                 table.add_column("Created", style="magenta")
@@ -500,7 +472,8 @@ class ChatManager:
                 table.add_column("Total Cost", style="white", justify="right")
                 table.add_column("First Question", style="white", max_width=60)
 
-                for s in chats:
+                # Rows go straight into the table; no intermediate list of chat dicts
+                for s in self.iter_chats(limit=limit or 100):
                     sid = s.get("chat_id", "")
                     created = s.get("created_timestamp", "")
                     prompt = s.get("prompt_name", "")
@@ -642,7 +615,7 @@ class ChatManager:
         except Exception as e:
             return fail(f"Failed to initialize VM: {e}")
 
-        start_time = datetime.now()
+        start_time = time.perf_counter()
         try:
             vm.execute()
         except VMExecutionError as e:
@@ -659,7 +632,7 @@ class ChatManager:
             }
         except Exception as e:
             return fail(f"Execution failed: {e}")
-        end_time = datetime.now()
+        end_time = time.perf_counter()
 
         # Persist the new chat
         self.save_chat(vm)
@@ -708,7 +681,7 @@ class ChatManager:
                 Console().print(Panel(md, title=f"chat {vm.prompt_uuid}:{vm.interaction_no}",
                                       subtitle=f"{vm.model_name}"))
 
-        return self.success(vm=vm, elapsed_time=(end_time - start_time).total_seconds(), params_dict=params_dict)
+        return self.success(vm=vm, elapsed_time=end_time - start_time, params_dict=params_dict)
 
     def execute_update(self):
         chat_id = getattr(self.args, "chat_id", None)
@@ -731,7 +704,7 @@ class ChatManager:
         # This ensures we capture all new messages generated during execution
         messages_before = len(vm.prompt.messages)
         
-        start_time = datetime.now()
+        start_time = time.perf_counter()
         try:
             vm.execute()
         except VMExecutionError as e:
@@ -745,11 +718,10 @@ class ChatManager:
                 "chat_id": vm.prompt_uuid,
                 "timestamp": datetime.now().isoformat(),
             }
-        end_time = datetime.now()
+        end_time = time.perf_counter()
 
         # Log total costs (reply path has no .exit statement to trigger this)
         if vm.toks_in > 0 or vm.toks_out > 0:
-            import time
             wall_time = time.time() - getattr(vm, 'wall_start', time.time())
             vm.logger.log_total_costs(vm.toks_in, vm.toks_out, vm.cost_in, vm.cost_out, vm.provider, vm.model_name, vm.prompt_uuid, vm.interaction_no, wall_time=wall_time, api_time=vm.api_time, context_usage=vm.vdict.get('context_usage'))
 
@@ -802,7 +774,7 @@ class ChatManager:
                 Console().print(Panel(md, title=f"chat {vm.prompt_uuid}:{vm.interaction_no}",
                                       subtitle=f"{vm.model_name}"))
 
-        return self.success(vm=vm, elapsed_time=(end_time - start_time).total_seconds())
+        return self.success(vm=vm, elapsed_time=end_time - start_time)
 
     # --------------------------------------------------------------------- #
     #  Core entry used by API routers
@@ -831,22 +803,3 @@ class ChatManager:
             data = {"success": False, "error": str(e), "timestamp": datetime.now().isoformat()}
 
         return data
-
-    @staticmethod
-    def _make_variables_serializable(variables: Dict[str, Any]) -> Dict[str, Any]:
-        """Make variables JSON serializable by converting complex objects to strings"""
-        serializable_vars = {}
-        for key, value in variables.items():
-            if hasattr(value, "__class__") and value.__class__.__name__ == "AiModel":
-                serializable_vars[key] = str(value)
-            elif hasattr(value, "__class__") and "Path" in value.__class__.__name__:
-                serializable_vars[key] = str(value)
-            elif isinstance(value, (str, int, float, bool, type(None))):
-                serializable_vars[key] = value
-            else:
-                try:
-                    json.dumps(value)
-                    serializable_vars[key] = value
-                except (TypeError, ValueError):
-                    serializable_vars[key] = str(value)
-        return serializable_vars
@@ -4,7 +4,6 @@ Provides a collapsible, interactive view of chat messages and function calls.
 """
 
 import sys  # Add this import at the top of the file
-import json
 import asyncio
 import warnings
 from pathlib import Path
@@ -17,6 +16,8 @@ from textual.binding import Binding
 from textual.screen import Screen, ModalScreen
 from rich.markdown import Markdown
 
+from .json_utils import dumps_pretty
+
 # Suppress ResourceWarning for unclosed client chats
 warnings.filterwarnings("ignore", category=ResourceWarning, message="unclosed.*client_chat")
 
@@ -73,11 +74,10 @@ class ChatViewer(Screen):
             if not data:
                 return {}
             
-            # Convert database format to the expected format
-            chat = data['chat']
+            # Convert database format to the expected format (get_chat has already parsed the JSON columns)
             return {
                 'messages': data['messages'],
-                'vm_state': json.loads(chat.vm_state_json) if chat.vm_state_json else {},
+                'vm_state': data['vm_state'],
                 'variables': data['variables']
             }
         except Exception:
@@ -353,104 +353,110 @@ class ChatViewer(Screen):
         root = tree.root
         root.set_label(f"📁 {chat_name}")
         
-        # VM State section
+        # Section nodes only; their children are added when first expanded (see on_tree_node_expanded)
         vm_state = self.chat_data.get('vm_state', {})
         if vm_state:
-            vm_node = root.add(f"📋 VM State ({vm_state.get('interaction_no', 0)} interactions)")
-            vm_node.data = {'type': 'vm_state', 'content': vm_state}
-            
-            # Add VM state details as children
-            for key, value in vm_state.items():
-                vm_node.add(f"{key}: {value}")
+            root.add(f"📋 VM State ({vm_state.get('interaction_no', 0)} interactions)",
+                     data={'type': 'vm_state', 'content': vm_state})
         
-        # Messages section
         messages = self.chat_data.get('messages', [])
         if messages:
-            messages_node = root.add(f"💬 Messages ({len(messages)} total)")
-            messages_node.data = {'type': 'messages_header', 'content': messages}
-            
-            # Add individual messages
-            for i, message in enumerate(messages):
-                role = message.get('role', 'unknown')
-                content = message.get('content', [])
-                
-                # Extract text content from various message types
-                text_content = ""
-                if isinstance(content, list) and content:
-                    text_parts = []
-                    for item in content:
-                        if isinstance(item, dict):
-                            item_type = item.get('type', '')
-                            
-                            # Handle text content
-                            if item_type == 'text':
-                                text_parts.append(item.get('text', ''))
-                            
-                            # Handle tool calls (function calls from assistant)
-                            elif item_type in ('tool', 'call'):
-                                name = item.get('name', 'unknown')
-                                args = item.get('arguments', {})
-                                call_id = item.get('id', '')
-                                # Format as function call
-                                args_str = ', '.join(f"{k}={v}" for k, v in args.items()) if isinstance(args, dict) else str(args)
-                                text_parts.append(f"Call {name}({args_str}) [id={call_id}]")
-                            
-                            # Handle tool results (function returns)
-                            elif item_type in ('tool_result', 'result'):
-                                name = item.get('name', 'unknown')
-                                result = item.get('content', item.get('result', ''))
-                                call_id = item.get('tool_use_id', item.get('id', ''))
-                                # Format as function result
-                                result_preview = str(result)[:100] + '...' if len(str(result)) > 100 else str(result)
-                                text_parts.append(f"Result {name}(): {result_preview} [id={call_id}]")
-                    
-                    text_content = '\n'.join(text_parts) if text_parts else ""
-                elif isinstance(content, str):
-                    text_content = content
-                
-                # Extract model metadata for assistant messages
-                model_name = message.get('model_name', '')
-                provider = message.get('provider', '')
-                
-                # Create message preview with model info for assistant messages
-                icon = self._get_role_icon(role, provider if role == 'assistant' else None)
-                preview = self._truncate_text(text_content) if text_content else "[Empty message]"
-                
-                # Add model name to label for assistant messages
-                if role == 'assistant' and model_name:
-                    # Show short model name
-                    short_model = model_name.split('/')[-1] if '/' in model_name else model_name
-                    label = f"{icon} {role.title()} [{short_model}]: {preview}"
-                else:
-                    label = f"{icon} {role.title()}: {preview}"
-                
-                msg_node = messages_node.add(label)
-                msg_node.data = {
-                    'type': 'message',
-                    'index': i,
-                    'role': role,
-                    'content': text_content,
-                    'full_message': message,
-                    'model_name': model_name,
-                    'provider': provider
-                }
-        
-        # Variables section
+            messages_node = root.add(f"💬 Messages ({len(messages)} total)",
+                                     data={'type': 'messages_header', 'content': messages})
+        
         variables = self.chat_data.get('variables', {})
         if variables:
-            vars_node = root.add(f"🔧 Variables ({len(variables)} items)")
-            vars_node.data = {'type': 'variables', 'content': variables}
-            
-            # Add variable details as children
-            for key, value in variables.items():
-                var_preview = self._truncate_text(str(value), 40)
-                vars_node.add(f"{key}: {var_preview}")
+            root.add(f"🔧 Variables ({len(variables)} items)",
+                     data={'type': 'variables', 'content': variables})
         
         # Expand the root and messages by default
         root.expand()
         if messages:
             messages_node.expand()
 
+    def on_tree_node_expanded(self, event: Tree.NodeExpanded) -> None:
+        """Add a section's children the first time it is expanded"""
+        node = event.node
+        if node.children or not node.data:
+            return
+        node_type = node.data.get('type')
+        content = node.data['content']
+        if node_type == 'messages_header':
+            self._add_message_nodes(node, content)
+        elif node_type == 'vm_state':
+            for key, value in content.items():
+                node.add_leaf(f"{key}: {value}")
+        elif node_type == 'variables':
+            for key, value in content.items():
+                node.add_leaf(f"{key}: {self._truncate_text(str(value), 40)}")
+
+    def _add_message_nodes(self, messages_node, messages: list) -> None:
+        """Add one node per message under the Messages section"""
+        for i, message in enumerate(messages):
+            role = message.get('role', 'unknown')
+            content = message.get('content', [])
+            
+            # Extract text content from various message types
+            text_content = ""
+            if isinstance(content, list) and content:
+                text_parts = []
+                for item in content:
+                    if isinstance(item, dict):
+                        item_type = item.get('type', '')
+                        
+                        # Handle text content
+                        if item_type == 'text':
+                            text_parts.append(item.get('text', ''))
+                        
+                        # Handle tool calls (function calls from assistant)
+                        elif item_type in ('tool', 'call'):
+                            name = item.get('name', 'unknown')
+                            args = item.get('arguments', {})
+                            call_id = item.get('id', '')
+                            # Format as function call
+                            args_str = ', '.join(f"{k}={v}" for k, v in args.items()) if isinstance(args, dict) else str(args)
+                            text_parts.append(f"Call {name}({args_str}) [id={call_id}]")
+                        
+                        # Handle tool results (function returns)
+                        elif item_type in ('tool_result', 'result'):
+                            name = item.get('name', 'unknown')
+                            result = item.get('content', item.get('result', ''))
+                            call_id = item.get('tool_use_id', item.get('id', ''))
+                            # Format as function result
+                            result_preview = str(result)[:100] + '...' if len(str(result)) > 100 else str(result)
+                            text_parts.append(f"Result {name}(): {result_preview} [id={call_id}]")
+                
+                text_content = '\n'.join(text_parts) if text_parts else ""
+            elif isinstance(content, str):
+                text_content = content
+            
+            # Extract model metadata for assistant messages
+            model_name = message.get('model_name', '')
+            provider = message.get('provider', '')
+            
+            # Create message preview with model info for assistant messages
+            icon = self._get_role_icon(role, provider if role == 'assistant' else None)
+            preview = self._truncate_text(text_content) if text_content else "[Empty message]"
+            
+            # Add model name to label for assistant messages
+            if role == 'assistant' and model_name:
+                # Show short model name
+                short_model = model_name.split('/')[-1] if '/' in model_name else model_name
+                label = f"{icon} {role.title()} [{short_model}]: {preview}"
+            else:
+                label = f"{icon} {role.title()}: {preview}"
+            
+            msg_node = messages_node.add_leaf(label)
+            msg_node.data = {
+                'type': 'message',
+                'index': i,
+                'role': role,
+                'content': text_content,
+                'full_message': message,
+                'model_name': model_name,
+                'provider': provider
+            }
+
     def on_data_table_row_selected(self, event: DataTable.RowSelected) -> None:
         """Handle chat selection from DataTable"""
         if event.data_table.id == "chat-table":
@@ -513,9 +519,9 @@ class ChatViewer(Screen):
             # Show raw content in separate container
             raw_container.border_title = "Raw Content"
             if 'content' in full_message and isinstance(full_message['content'], list):
-                raw_widget.update(json.dumps(full_message['content'], indent=4, ensure_ascii=False))
+                raw_widget.update(dumps_pretty(full_message['content']).decode('utf-8'))
             else:
-                raw_widget.update(json.dumps(full_message, indent=4, ensure_ascii=False))
+                raw_widget.update(dumps_pretty(full_message).decode('utf-8'))
             
         elif node_type == 'vm_state':
             # Clear message content since this is not a message
@@ -534,7 +540,7 @@ class ChatViewer(Screen):
             
             # Show raw JSON in separate container
             raw_container.border_title = "Raw VM State"
-            raw_widget.update(json.dumps(vm_state, indent=4, ensure_ascii=False))
+            raw_widget.update(dumps_pretty(vm_state).decode('utf-8'))
             
         elif node_type == 'variables':
             # Clear message content since this is not a message
@@ -553,7 +559,7 @@ class ChatViewer(Screen):
             
             # Show raw JSON in separate container
             raw_container.border_title = "Raw Variables"
-            raw_widget.update(json.dumps(variables, indent=4, ensure_ascii=False))
+            raw_widget.update(dumps_pretty(variables).decode('utf-8'))
             
         else:
             # Clear message content since this is not a message
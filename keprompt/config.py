@@ -34,16 +34,21 @@ class Config:
                 'max_size_gb': 2.0,
                 'max_count': 5000
             },
+            'cache': {
+                'responses': False,  # Reuse LLM responses for byte-identical requests
+                'max_entries': 1024
+            },
             'env': {
                 'file_path': str(Path.home() / '.env')  # Default to ~/.env
             }
         }
         
         # Load from config file if it exists
+        cwd = Path.cwd()
         config_paths = [
             Path.home() / '.keprompt' / 'config.toml',
-            Path.cwd() / 'keprompt.toml',
-            Path.cwd() / '.keprompt.toml'
+            cwd / 'keprompt.toml',
+            cwd / '.keprompt.toml'
         ]
         
         for config_path in config_paths:
@@ -85,6 +90,11 @@ class Config:
         chats_enabled = os.getenv('KEPROMPT_CHATS')
         if chats_enabled is not None:
             self._config['chats']['enabled'] = chats_enabled.lower() in ('true', '1', 'yes', 'on')
+
+        # response cache override
+        response_cache = os.getenv('KEPROMPT_RESPONSE_CACHE')
+        if response_cache is not None:
+            self._config['cache']['responses'] = response_cache.lower() in ('true', '1', 'yes', 'on')
     
     def get(self, section: str, key: str, default: Any = None) -> Any:
         """Get configuration value."""
@@ -98,6 +108,10 @@ class Config:
         """Check if chats are enabled."""
         return self.get('chats', 'enabled', True)
     
+    def is_response_cache_enabled(self) -> bool:
+        """Check if identical LLM requests may be answered from the response cache."""
+        return self.get('cache', 'responses', False)
+    
     def get_cleanup_settings(self) -> Dict[str, Any]:
         """Get cleanup settings."""
         return {
@@ -17,6 +17,8 @@ from typing import Optional, Dict, Any
 
 from .version import __version__
 
+_JSON_SCALARS = (str, int, float, bool, type(None))
+
 
 class CostTracker:
     """
@@ -236,21 +238,12 @@ class CostTracker:
         if parameters:
             try:
                 # Create a serializable copy of parameters
-                serializable_params = {}
-                for key, value in parameters.items():
-                    if hasattr(value, '__class__') and value.__class__.__name__ == 'AiModel':
-                        # Use the new __str__ method for AiModel objects
-                        serializable_params[key] = str(value)
-                    elif hasattr(value, '__class__') and 'Path' in value.__class__.__name__:
-                        # Handle PosixPath, WindowsPath, etc.
-                        serializable_params[key] = str(value)
-                    elif isinstance(value, (str, int, float, bool, type(None))):
-                        # Keep simple types as-is
-                        serializable_params[key] = value
-                    else:
-                        # Convert other objects to string representation
-                        # This handles any remaining object types gracefully
-                        serializable_params[key] = str(value)
+                # Simple types are kept as-is; anything else (AiModel, Path, ...) is stored
+                # as its string representation
+                serializable_params = {
+                    key: value if isinstance(value, _JSON_SCALARS) else str(value)
+                    for key, value in parameters.items()
+                }
                 
                 parameters_json = json.dumps(serializable_params)
             except (TypeError, ValueError):
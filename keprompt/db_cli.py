@@ -33,6 +33,9 @@ def delete_database() -> None:
         if db_file.exists():
             try:
                 db_file.unlink()
+                # Drop WAL sidecar files too, so a stale log is never replayed into a new database
+                for suffix in ('-wal', '-shm'):
+                    Path(f"{db_path}{suffix}").unlink(missing_ok=True)
                 console.print(f"[bold green]✅ Database deleted: {db_path}[/bold green]")
             except OSError as e:
                 console.print(f"[bold red]❌ Error deleting database: {e}[/bold red]")
@@ -3,6 +3,73 @@
 import json
 import sys
 
+try:
+    import orjson
+except ImportError:  # orjson is an optional speedup; fall back to the stdlib codec
+    orjson = None
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers only
+# ever need to catch the stdlib exception type.
+_loads = orjson.loads if orjson is not None else json.loads
+
+
+def loads(data):
+    """Parse JSON from str or UTF-8 bytes (e.g. a raw HTTP response body)."""
+    return _loads(data)
+
+
+def dumps_bytes(obj) -> bytes:
+    """Serialize obj to compact UTF-8 JSON bytes (e.g. an HTTP request body).
+
+    Non-str dict keys (int, float, bool, None) are coerced to strings as the
+    stdlib encoder does, so either codec accepts the same objects.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _stdlib_dumps(obj, default=None) -> str:
+    return json.dumps(obj, default=default, ensure_ascii=False, separators=(',', ':'))
+
+
+def dumps(obj, default=None) -> str:
+    """Serialize obj to compact JSON text (e.g. a TEXT database column).
+
+    default is called for objects the stdlib codec can't encode natively; orjson
+    passes dataclasses and datetimes through to it too, so both codecs agree.
+    Integers wider than 64 bits, which orjson rejects, go through the stdlib codec.
+    """
+    if orjson is None:
+        return _stdlib_dumps(obj, default)
+    option = orjson.OPT_NON_STR_KEYS
+    if default is not None:
+        option |= orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_PASSTHROUGH_DATETIME
+    try:
+        return orjson.dumps(obj, default=default, option=option).decode('utf-8')
+    except orjson.JSONEncodeError:  # a TypeError, raised for e.g. 2**64 before default= is consulted
+        return _stdlib_dumps(obj, default)
+
+
+def dumps_pretty(obj, default=None) -> bytes:
+    """Serialize obj to 2-space indented UTF-8 JSON bytes (e.g. a file written to disk).
+
+    default is called for objects the codec can't encode natively, as with json.dumps.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=default, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=default, indent=2, ensure_ascii=False).encode('utf-8')
+
+
+def json_fragment(obj):
+    """Pre-serialize obj so it is not re-encoded each time it is embedded in dumps_bytes().
+
+    Returns an orjson.Fragment when available (orjson >= 3.9), else obj unchanged.
+    """
+    if orjson is not None and hasattr(orjson, 'Fragment'):
+        return orjson.Fragment(orjson.dumps(obj))
+    return obj
+
 
 def safe_json_loads(raw: str, context: str = ""):
     """Parse JSON with recovery for common LLM malformations.
@@ -22,7 +89,7 @@ def safe_json_loads(raw: str, context: str = ""):
         json.JSONDecodeError: If JSON cannot be recovered.
     """
     try:
-        return json.loads(raw)
+        return _loads(raw)
     except json.JSONDecodeError as e:
         repaired = _try_repair(raw)
         if repaired is not None:
@@ -8,7 +8,8 @@ from rich.console import Console
 
 from keprompt.api import handle_json_command
 from .config import get_config
-from .CustomEncoder import CustomEncoder
+from .CustomEncoder import encode_default
+from .json_utils import dumps_pretty
 from rich.logging import RichHandler
 from rich.prompt import Prompt as RichPrompt
 from rich.table import Table
@@ -263,26 +264,17 @@ def get_cmd_args() -> tuple[argparse.ArgumentParser, argparse.Namespace]:
 
     subparsers = parser.add_subparsers(dest="command", required=True)
 
-    # Register CLI commands via managers (clean architecture)
-    from .Prompt import PromptManager
-    from .ModelManager import ModelManager
-    from .chat_manager import ChatManager
-    from .database import DatabaseManager
-    from .api import ProviderManager, FunctionManager
-    from .workspace_manager import WorkspaceManager
-
-    PromptManager.register_cli(subparsers, parent)
-    ModelManager.register_cli(subparsers, parent)
-    ChatManager.register_cli(subparsers, parent)
-    DatabaseManager.register_cli(subparsers, parent)
-    ProviderManager.register_cli(subparsers, parent)
-    FunctionManager.register_cli(subparsers, parent)
-    WorkspaceManager.register_cli(subparsers, parent)
-
-
     # Allow verb-first syntax: "keprompt new chat ..." → "keprompt chat new ..."
     _swap_verb_object_if_needed()
 
+    # Register CLI commands via managers (clean architecture). When argv names a command
+    # only its group is built (and imported); --help, --version and errors get all of them
+    from .api import get_cli_manager_classes
+
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    for manager_class in get_cli_manager_classes(command):
+        manager_class.register_cli(subparsers, parent)
+
     args = parser.parse_args()
     return parser, args
 
@@ -499,8 +491,7 @@ def main():
             "meta": {"schema_version": 1, "command": f"{getattr(args, 'command', '?')}", "version": __version__},
         }
         if 'output_format' in locals() and output_format == 'json':
-            import json as _json
-            sys.stdout.write(_json.dumps(err_envelope, indent=2, cls=CustomEncoder) + "\n")
+            sys.stdout.write(dumps_pretty(err_envelope, default=encode_default).decode('utf-8') + "\n")
         else:
             err_console = Console(file=sys.stderr)
             err_console.print(err_envelope)
@@ -19,9 +19,9 @@ class FunctionSpace:
 
     This rewritten version now:
       • Tracks ALL instances of FunctionSpace in a class-level registry
-      • Creates the ONE KePrompt singletons eagerly at import time:
+      • Creates the ONE KePrompt singleton on first access:
             FunctionSpace.functions → prompts/functions
-      • Loads function definitions immediately
+      • Loads function definitions when the singleton is created
       • Builds tools_array and function_array
       • Exposes callable wrappers
       • Provides a .call(name, args) execution API
@@ -36,14 +36,15 @@ class FunctionSpace:
     def get(cls, directory: str) -> "FunctionSpace":
         """
         Retrieve an existing FunctionSpace or create one if needed.
-        This powers the eager singletons below.
+        This powers the lazy singleton below.
         """
         directory = str(directory)
         if directory not in cls._instances:
             cls._instances[directory] = cls(directory)
         return cls._instances[directory]
 
-    # EAGER SINGLETONS – created immediately when module imports
+    # LAZY SINGLETON – created on first access, so importing keprompt (or running
+    # commands that never touch functions) doesn't run every function provider
     functions: "FunctionSpace" = None  # assigned after class definition
 
     # ------------------------------------------------------------------
@@ -56,6 +57,7 @@ class FunctionSpace:
         self.function_array: List[Dict[str, Any]] = []
         self.tools_array: List[Dict[str, Any]] = []
         self.functions: Dict[str, Callable[..., Any]] = {}
+        self._executables: Dict[str, str] = {}  # function name -> provider executable
 
         # Load everything immediately
         import time
@@ -156,9 +158,11 @@ class FunctionSpace:
     # ------------------------------------------------------------------
     def _create_callable_wrappers(self, definitions: List[Dict[str, Any]]):
         self.functions.clear()
+        self._executables.clear()
         for d in definitions:
             name = d["name"]
             executable = d["_executable"]
+            self._executables[name] = executable
             self.functions[name] = self._make_wrapper(name, executable)
 
     def _make_wrapper(self, func_name: str, executable: str):
@@ -256,12 +260,7 @@ class FunctionSpace:
         """
         
         # Execute as an external function (subprocess)
-        executable = None
-        for d in self.function_array:
-            if d["name"] == function_name:
-                executable = d.get("_executable")
-                break
-
+        executable = self._executables.get(function_name)
         if executable is None:
             raise Exception(f"Unknown function '{function_name}'")
 
@@ -285,6 +284,18 @@ class FunctionSpace:
 
 
 # ----------------------------------------------------------------------
-# ASSIGN EAGER SINGLETONS NOW THAT CLASS IS FULLY DEFINED
+# ASSIGN LAZY SINGLETON NOW THAT CLASS IS FULLY DEFINED
 # ----------------------------------------------------------------------
-FunctionSpace.functions = FunctionSpace.get("prompts/functions")
+class _LazySpace:
+    """Class attribute that loads its FunctionSpace on first access, then replaces itself."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def __get__(self, instance, owner):
+        space = owner.get(self.directory)
+        owner.functions = space
+        return space
+
+
+FunctionSpace.functions = _LazySpace("prompts/functions")
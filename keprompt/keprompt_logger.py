@@ -5,6 +5,7 @@ This module provides a professional logging interface using Python's standard lo
 module with custom log levels and multi-process safe single log file output.
 """
 
+import contextlib
 import logging
 import os
 import sys
@@ -74,6 +75,20 @@ class StandardLogger:
         self.console = Console(stderr=True)
         self.terminal_width = self.console.size.width
     
+    @property
+    def debug_enabled(self) -> bool:
+        """True when log output is emitted; lets callers skip building log-only payloads."""
+        return self.mode == LogMode.DEBUG
+
+    def batch(self):
+        """Context manager that holds DEBUG console output and writes it out once on exit.
+
+        Nested batches flush with the outermost one; outside DEBUG mode it does nothing.
+        """
+        if self.mode == LogMode.DEBUG:
+            return self.console  # rich buffers everything printed inside `with console:`
+        return contextlib.nullcontext()
+
     def set_prompt_id(self, prompt_id: str):
         """Set the prompt ID for compatibility."""
         self.prompt_id = prompt_id
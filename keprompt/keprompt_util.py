@@ -1,6 +1,7 @@
 import argparse
 import os
 import re
+from enum import IntEnum
 from typing import Optional
 
 from rich.console import Console
@@ -21,6 +22,14 @@ CHAR_SEND_REQUEST = RIGHT_TRIANGLE
 HORIZONTAL_LINE = u"\u2500"
 
 
+class Role(IntEnum):
+    """Integer codes for message roles, so converters compare ints instead of strings."""
+    SYSTEM = 0
+    USER = 1
+    ASSISTANT = 2
+    TOOL = 3
+
+
 
 def backup_file(filepath: str, backup_dir: Optional[str] = None, extension: Optional[str] = None) -> str:
     """Version files with numbered backups.
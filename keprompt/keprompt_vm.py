@@ -1221,10 +1221,11 @@ class StmtExec(StmtPrompt):
         # Store last response using centralized method with automatic logging
         vm.set_variable('last_response', last_response_text)
 
-        # Log token usage and costs if available
-        if hasattr(vm.prompt, 'last_tokens_in') and hasattr(vm.prompt, 'last_tokens_out'):
-            tokens_in = vm.prompt.last_tokens_in
-            tokens_out = vm.prompt.last_tokens_out
+        # Log token usage and costs if available (set by the provider once a call completes)
+        tokens_in = getattr(vm.prompt, 'last_tokens_in', None)
+        tokens_out = getattr(vm.prompt, 'last_tokens_out', None)
+        has_usage = tokens_in is not None and tokens_out is not None
+        if has_usage:
             cost_in = tokens_in * vm.model.input_cost if vm.model else 0
             cost_out = tokens_out * vm.model.output_cost if vm.model else 0
             
@@ -1266,8 +1267,8 @@ class StmtExec(StmtPrompt):
         vm.logger.log_llm_call(f"Response from {vm.model.provider} API completed", call_id)
 
         # Track cost data to new database system (always-on cost tracking)
-        # Get token information from the first hasattr block above
-        if hasattr(vm.prompt, 'last_tokens_in') and hasattr(vm.prompt, 'last_tokens_out'):
+        # Uses the token counts and costs computed in the usage block above
+        if has_usage:
             # Get model configuration parameters
             temperature = vm.llm.get('temperature') if vm.llm else None
             max_tokens = vm.llm.get('max_tokens') if vm.llm else None
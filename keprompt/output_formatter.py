@@ -2,12 +2,16 @@
 Centralized output formatting for keprompt CLI.
 Handles both JSON serialization and Rich table formatting.
 """
-import json
+from dataclasses import asdict, is_dataclass
 from datetime import datetime
 from decimal import Decimal
+from pathlib import PurePath
 from typing import Any, Dict, List, Optional
 from rich.table import Table
 from rich.markdown import Markdown
+from rich.text import Text
+
+from .json_utils import dumps_pretty
 
 
 class OutputFormatter:
@@ -33,6 +37,9 @@ class OutputFormatter:
         'tool': 'cyan',
         'tool_result': 'cyan'
     }
+
+    # Pre-styled role cells: Rich renders Text as is, with no markup parsing per row
+    ROLE_TEXTS = {role: Text.styled(role, color) for role, color in ROLE_COLORS.items()}
     
     @classmethod
     def format(cls, data: Any, format_type: str = "pretty", response_type: Optional[str] = None, title: Optional[str] = None) -> Any:
@@ -71,8 +78,11 @@ class OutputFormatter:
             elif isinstance(obj, Decimal):
                 return float(obj)
             # Handle Path objects
-            elif hasattr(obj, '__class__') and 'Path' in obj.__class__.__name__:
+            elif isinstance(obj, PurePath):
                 return str(obj)
+            # Handle dataclasses (AiModel uses __slots__, so it has no __dict__)
+            elif is_dataclass(obj) and not isinstance(obj, type):
+                return asdict(obj)
             # Handle other objects with __dict__
             elif hasattr(obj, '__dict__'):
                 return obj.__dict__
@@ -80,7 +90,7 @@ class OutputFormatter:
             else:
                 return str(obj)
         
-        return json.dumps(data, indent=2, default=serialize)
+        return dumps_pretty(data, default=serialize).decode('utf-8')
     
     @classmethod
     def _format_pretty(cls, data: Any, response_type: Optional[str] = None, title: Optional[str] = None) -> Any:
@@ -133,8 +143,7 @@ class OutputFormatter:
         
         for provider in provider_list:
             provider_name = provider["name"]
-            color = cls.PROVIDER_COLORS.get(provider_name.lower(), 'cyan')
-            colored_name = f"[{color}]{provider_name}[/{color}]"
+            colored_name = Text.styled(provider_name, cls.PROVIDER_COLORS.get(provider_name.lower(), 'cyan'))
             table.add_row(colored_name, str(provider["models_count"]))
         
         return table
@@ -226,8 +235,7 @@ class OutputFormatter:
                     model_name = msg["model_name"]
                     short_model = model_name.split('/')[-1] if '/' in model_name else model_name
                     provider = msg.get('provider', '').lower()
-                    color = cls.PROVIDER_COLORS.get(provider, 'yellow')
-                    model_display = f"[{color}]{short_model}[/{color}]"
+                    model_display = Text.styled(short_model, cls.PROVIDER_COLORS.get(provider, 'yellow'))
                 
                 # Build message text
                 txt = ''
@@ -246,8 +254,7 @@ class OutputFormatter:
                 
                 if txt:
                     # Colorize role
-                    role_color = cls.ROLE_COLORS.get(role, 'white')
-                    colored_role = f"[{role_color}]{role}[/{role_color}]"
+                    colored_role = cls.ROLE_TEXTS.get(role) or Text.styled(role, 'white')
                     md = Markdown(txt[:-1])  # Remove trailing newline
                     table.add_row(colored_role, model_display, md)
             
@@ -288,9 +295,8 @@ class OutputFormatter:
             # Show as JSON Panel
             from rich.panel import Panel
             from rich.syntax import Syntax
-            import json
             
-            json_str = json.dumps(data, indent=2, default=str)
+            json_str = dumps_pretty(data, default=str).decode('utf-8')
             syntax = Syntax(json_str, "json", theme="monokai", line_numbers=False)
             return Panel(syntax, title=title or f"Chat Detail (Raw) - {chat_id}", border_style="cyan")
         
@@ -368,8 +374,7 @@ class OutputFormatter:
                 model_name = msg["model_name"]
                 short_model = model_name.split('/')[-1] if '/' in model_name else model_name
                 provider = msg.get('provider', '').lower()
-                color = cls.PROVIDER_COLORS.get(provider, 'yellow')
-                model_display = f"[{color}]{short_model}[/{color}]"
+                model_display = Text.styled(short_model, cls.PROVIDER_COLORS.get(provider, 'yellow'))
             
             # Build message text
             txt = ''
@@ -388,8 +393,7 @@ class OutputFormatter:
             
             if txt:
                 # Colorize role
-                role_color = cls.ROLE_COLORS.get(role, 'white')
-                colored_role = f"[{role_color}]{role}[/{role_color}]"
+                colored_role = cls.ROLE_TEXTS.get(role) or Text.styled(role, 'white')
                 md = Markdown(txt[:-1])  # Remove trailing newline
                 table.add_row(colored_role, model_display, md)
         
@@ -426,10 +430,9 @@ class OutputFormatter:
         if isinstance(actual_data, dict):
             from rich.panel import Panel
             from rich.syntax import Syntax
-            import json
             
             # Format as pretty JSON with syntax highlighting
-            json_str = json.dumps(actual_data, indent=2, default=str)
+            json_str = dumps_pretty(actual_data, default=str).decode('utf-8')
             syntax = Syntax(json_str, "json", theme="monokai", line_numbers=False)
             return Panel(syntax, title=title or "Details", border_style="cyan")
             
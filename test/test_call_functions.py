@@ -0,0 +1,206 @@
+"""
+Tests for AiProvider call plumbing: call_functions and the shared HTTP session.
+
+Tool calls from one LLM response run concurrently, but results, logging
+and agent numbering must stay in the order the model requested them.
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from keprompt.AiAnthropic import AiAnthropic
+from keprompt.AiPrompt import AiCall, AiMessage
+from keprompt.keprompt_function_space import FunctionSpace
+
+
+class FakeVM:
+    ip = 0
+
+    def __init__(self, allowed):
+        self.allowed_functions = allowed
+        self.vdict = {}
+        self.logger = MagicMock()
+
+    def substitute(self, text):
+        return text
+
+
+@pytest.fixture
+def functions(monkeypatch):
+    calls = []
+
+    def recorded(name):
+        def fn(**kwargs):
+            calls.append((name, kwargs))
+            return f"{name} done"
+        return fn
+
+    def broken(**kwargs):
+        raise RuntimeError("boom")
+
+    space = SimpleNamespace(tools_array=[], functions={"first": recorded("first"), "second": recorded("second"), "broken": broken})
+    monkeypatch.setattr(FunctionSpace, "functions", space)
+    return calls
+
+
+def run(vm, parts):
+    handler = AiAnthropic(SimpleNamespace(vm=vm, model="m", provider="p"))
+    return handler.call_functions(AiMessage(vm, "assistant", parts))
+
+
+def test_calls_overlap_and_keep_order(functions):
+    # "first" and "second" only return once both are running, so they must overlap
+    both_running = threading.Barrier(2, timeout=5)
+    space = FunctionSpace.functions.functions
+    for name, fn in [("first", space["first"]), ("second", space["second"])]:
+        def meet_then_run(fn=fn, **kwargs):
+            both_running.wait()
+            return fn(**kwargs)
+        space[name] = meet_then_run
+
+    vm = FakeVM(["first", "second", "broken"])
+    parts = [
+        AiCall(vm, "second", {}, id="a"),
+        AiCall(vm, "forbidden", {}, id="b"),
+        AiCall(vm, "first", {"agent_name": "x"}, id="c"),
+        AiCall(vm, "broken", {}, id="d"),
+    ]
+
+    msg = run(vm, parts)
+
+    assert [(r.id, r.result) for r in msg.content] == [
+        ("a", "second done"),
+        ("b", "Error: function 'forbidden' is not in the allowed functions list"),
+        ("c", "first done"),
+        ("d", "Error calling boom"),
+    ]
+    assert ("first", {"agent_name": "x", "agent_number": ".3"}) in functions
+    assert [c.args[0] for c in vm.logger.log_function_call.call_args_list] == ["second", "first", "broken"]
+    assert vm.vdict["_tool_index"] == 4
+
+
+def test_read_after_write_of_same_file_sees_the_write(functions, tmp_path):
+    path = tmp_path / "notes.txt"
+
+    def writefile(filename, content):
+        time.sleep(0.1)  # a slow write is overtaken by the read if they overlap
+        Path(filename).write_text(content)
+        return "written"
+
+    def readfile(filename):
+        return Path(filename).read_text() if Path(filename).exists() else "missing"
+
+    FunctionSpace.functions.functions.update(writefile=writefile, readfile=readfile)
+    vm = FakeVM(None)
+    parts = [AiCall(vm, "writefile", {"filename": str(path), "content": "hello"}, id="w"),
+             AiCall(vm, "readfile", {"filename": str(path)}, id="r")]
+
+    msg = run(vm, parts)
+
+    assert [(r.id, r.result) for r in msg.content] == [("w", "written"), ("r", "hello")]
+
+
+def test_no_calls_returns_none(functions):
+    vm = FakeVM(None)
+    assert run(vm, []) is None
+
+
+def test_http_session_is_shared():
+    from keprompt.AiProvider import http_session
+    session = http_session()
+    assert http_session() is session
+
+
+def test_call_llm_builds_url_and_headers_once(functions, monkeypatch):
+    vm = FakeVM(["first"])
+    vm.logger.terminal_width = 80
+    prompt = SimpleNamespace(vm=vm, model="m", provider="p", messages=[], api_key="k")
+    handler = AiAnthropic(prompt)
+    monkeypatch.setattr(handler, "prepare_request", lambda messages: {"messages": messages})
+    responses = iter([
+        {"content": [{"type": "tool_use", "id": "t1", "name": "first", "input": {}}]},
+        {"content": [{"type": "text", "text": "done"}]},
+    ])
+    sent = []
+    monkeypatch.setattr(handler, "make_api_request",
+                        lambda url, headers, data, label: sent.append((url, headers)) or next(responses))
+    built = []
+    original_headers = handler.get_headers
+    monkeypatch.setattr(handler, "get_headers", lambda: built.append(1) or original_headers())
+
+    result = handler.call_llm(label="│01 .exec")
+    assert [m.role for m in result] == ["assistant", "tool", "assistant"]
+    assert len(sent) == 2 and sent[0] == sent[1]
+    assert built == [1]
+
+
+def test_response_log_lines_are_written_before_its_tool_calls_run(functions, monkeypatch):
+    import io
+    from rich.console import Console
+    from keprompt.keprompt_logger import LogMode, StandardLogger
+    provider_module = sys.modules["keprompt.AiProvider"]
+    bodies = iter([b'{"content":[{"type":"tool_use","id":"t1","name":"first","input":{}}],"usage":{"input_tokens":5,"output_tokens":2}}',
+                   b'{"content":[{"type":"text","text":"done"}],"usage":{"input_tokens":9,"output_tokens":1}}'])
+    session = SimpleNamespace(post=lambda **kw: SimpleNamespace(
+        status_code=200, content=next(bodies), elapsed=SimpleNamespace(total_seconds=lambda: 0.5)))
+    monkeypatch.setattr(provider_module, "http_session", lambda: session)
+
+    vm = FakeVM(["first"])
+    vm.logger = StandardLogger("t", mode=LogMode.DEBUG)
+    out = io.StringIO()
+    vm.logger.console = Console(file=out, width=120)
+    seen_by_tool = []
+    FunctionSpace.functions.functions["first"] = lambda: seen_by_tool.append(out.getvalue()) or "ok"
+    prompt = SimpleNamespace(vm=vm, model="m", provider="p", messages=[], api_key="k", toks_in=0, toks_out=0)
+    handler = AiAnthropic(prompt)
+    monkeypatch.setattr(handler, "prepare_request", lambda messages: {"messages": messages})
+    monkeypatch.setattr(handler, "calculate_costs", lambda tokens_in, tokens_out: (0.0, 0.0))
+
+    handler.call_llm(label="│01 .exec")
+
+    assert "tokens in: 5" in seen_by_tool[0]
+
+
+@pytest.mark.parametrize("cache_enabled", [True, False])
+def test_identical_request_served_from_response_cache(monkeypatch, tmp_path, cache_enabled):
+    from keprompt import database
+    provider_module = sys.modules["keprompt.AiProvider"]
+    monkeypatch.setattr(database.database_proxy, "obj", database.database_proxy.obj)  # restored afterwards
+    database.initialize_database(f"sqlite:///{tmp_path}/chats.db")
+    monkeypatch.setattr(database, "_db_manager", database.DatabaseManager())
+    body = b'{"content":[{"type":"text","text":"hi"}],"usage":{"input_tokens":5,"output_tokens":2}}'
+    posts = []
+    session = SimpleNamespace(post=lambda **kw: posts.append(kw) or SimpleNamespace(
+        status_code=200, content=body, elapsed=SimpleNamespace(total_seconds=lambda: 0.5)))
+    monkeypatch.setattr(provider_module, "http_session", lambda: session)
+
+    vm = FakeVM(None)
+    vm.logger.terminal_width = 80
+    prompt = SimpleNamespace(vm=vm, model="m", provider="p", cache_enabled=cache_enabled, toks_in=0, toks_out=0)
+    handler = AiAnthropic(prompt)
+    monkeypatch.setattr(handler, "calculate_costs", lambda tokens_in, tokens_out: (float(tokens_in), float(tokens_out)))
+
+    request = {"model": "m", "messages": [{"role": "user", "content": "hello"}]}
+    first = handler.make_api_request("https://x/v1", {}, request, "Call-01")
+    second = handler.make_api_request("https://x/v1", {}, dict(request), "Call-02")
+
+    assert first == second
+    if cache_enabled:
+        assert len(posts) == 1
+        assert (prompt.toks_in, prompt.last_cost_in) == (5, 0.0)
+    else:
+        assert len(posts) == 2
+        assert prompt.toks_in == 10
+
+
+def test_display_args_truncates_all_but_file_names():
+    from keprompt.AiProvider import _display_args
+    long = "x" * 60
+    assert _display_args("readfile", {"filename": long, "note": long}) == {"filename": long, "note": "x" * 47 + "..."}
+    assert _display_args("execcmd", {"filename": long, "n": 3}) == {"filename": "x" * 47 + "...", "n": 3}
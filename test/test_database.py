@@ -0,0 +1,197 @@
+"""Tests for chat persistence (keprompt.database and ChatManager's save/load helpers) on a throwaway SQLite file."""
+
+import pytest
+
+from keprompt import database
+from keprompt.database import DatabaseManager, initialize_database
+
+
+@pytest.fixture
+def db_manager(tmp_path):
+    previous = database.database_proxy.obj
+    initialize_database(f"sqlite:///{tmp_path}/chats.db")
+    yield DatabaseManager()
+    database.database_proxy.initialize(previous)
+
+
+def _save_call(manager, chat_id, msg_no, model, elapsed):
+    manager.save_cost_tracking(
+        chat_id=chat_id, msg_no=msg_no, call_id=f"{chat_id}-{msg_no}",
+        tokens_in=1, tokens_out=1, cost_in=0, cost_out=0, estimated_costs=0,
+        elapsed_time=elapsed, model=model, provider="openai", execution_mode="production",
+    )
+
+
+def test_chat_call_summaries_use_latest_call_and_total_time(db_manager):
+    _save_call(db_manager, "aaaa0001", 1, "gpt-4o-mini", 1.5)
+    _save_call(db_manager, "aaaa0001", 3, "gpt-4o", 2.25)
+    _save_call(db_manager, "aaaa0001", 2, "gpt-4.1", 0.25)
+    _save_call(db_manager, "bbbb0002", 1, "o3", 4.0)
+    _save_call(db_manager, "cccc0003", 1, "o1", 9.0)
+
+    summaries = db_manager.get_chat_call_summaries(["aaaa0001", "bbbb0002", "dddd0004"])
+
+    assert summaries == {
+        "aaaa0001": ("gpt-4o", "openai", pytest.approx(4.0)),
+        "bbbb0002": ("o3", "openai", pytest.approx(4.0)),
+    }
+
+
+def test_chat_call_summaries_empty_ids(db_manager):
+    assert db_manager.get_chat_call_summaries([]) == {}
+
+
+def test_cost_tracking_batch_inserts_new_and_updates_existing(db_manager):
+    _save_call(db_manager, "aaaa0001", 1, "gpt-4o-mini", 1.0)
+    row = dict(call_id="c", tokens_in=1, tokens_out=1, cost_in=0, cost_out=0, estimated_costs=0,
+               elapsed_time=2.0, provider="openai", execution_mode="production")
+
+    db_manager.save_cost_tracking_batch(
+        "aaaa0001", [(msg_no, {**row, "model": f"m{msg_no}"}) for msg_no in range(1, 51)])
+
+    summaries = db_manager.get_chat_call_summaries(["aaaa0001"])
+    assert summaries == {"aaaa0001": ("m50", "openai", pytest.approx(100.0))}
+    assert db_manager.get_database_stats()["cost_records"] == 50
+
+
+def test_chat_save_commits_chat_and_pending_costs(db_manager):
+    from types import SimpleNamespace
+    from keprompt.chat_manager import ChatManager
+    from keprompt.keprompt_logger import LogMode
+
+    vm = SimpleNamespace(
+        prompt_uuid="eeee0005", prompt=SimpleNamespace(to_json=lambda: [{"role": "user", "content": []}]),
+        ip=2, model_name="gpt-4o", model=None, provider="openai", interaction_no=1,
+        log_mode=LogMode.PRODUCTION, vm_debug=False, exec_debug=False,
+        toks_in=10, toks_out=5, cost_in=0.0, cost_out=0.0,
+        prompt_name="hello", prompt_version="1.0", allowed_functions=None, filename="hello.prompt",
+        vdict={"name": "World"}, serialize_statements=lambda: [],
+        pending_costs=[(1, dict(call_id="c", tokens_in=10, tokens_out=5, cost_in=0, cost_out=0, estimated_costs=0,
+                                elapsed_time=1.0, model="gpt-4o", provider="openai", execution_mode="production"))],
+    )
+    manager = ChatManager()
+    manager.db_manager = db_manager
+
+    assert manager.save_chat(vm) == "eeee0005"
+    assert vm.pending_costs == []
+
+    saved = db_manager.get_chat_with_costs("eeee0005")
+    assert saved["variables"] == {"name": "World"}
+    assert [cost["msg_no"] for cost in saved["costs"]] == [1]
+
+
+def test_saved_messages_rebuild_to_the_same_json():
+    from types import SimpleNamespace
+    from keprompt.AiPrompt import AiCall, AiMessage, AiResult, AiTextPart
+
+    vm = SimpleNamespace(substitute=lambda text: text, ip=0)
+    parts = [AiTextPart(vm=vm, text="hi"),
+             AiCall(vm=vm, name="readfile", arguments={"filename": "a.txt"}, id="call_1"),
+             AiResult(vm=vm, name="readfile", id="call_1", result="contents")]
+    saved = [AiMessage(vm=vm, role="assistant", content=parts, model_name="gpt-4o", provider="openai").to_json()]
+
+    restored = AiMessage.from_json_list(vm, [{**saved[0], "content": saved[0]["content"] + [
+        {"type": "image_url", "image_url": {"url": "data:"}}]}])
+
+    assert [message.to_json() for message in restored] == saved
+
+
+def test_message_json_does_not_share_call_arguments():
+    from types import SimpleNamespace
+    from keprompt.AiPrompt import AiCall, AiMessage
+
+    vm = SimpleNamespace(substitute=lambda text: text, ip=0)
+    call = AiCall(vm=vm, name="readfile", arguments={"filename": "a.txt"}, id="call_1")
+    saved = AiMessage(vm=vm, role="assistant", content=[call]).to_json()
+
+    saved["content"][0]["arguments"]["filename"] = "b.txt"
+
+    assert call.arguments == {"filename": "a.txt"}
+
+
+def test_response_cache_keeps_most_recently_used_entries(db_manager):
+    db_manager.save_cached_response("a", '{"n":0}', max_entries=2)
+    db_manager.save_cached_response("b", '{"n":1}', max_entries=2)
+    assert db_manager.get_cached_response("a") == '{"n":0}'
+    db_manager.save_cached_response("c", '{"n":2}', max_entries=2)
+
+    assert db_manager.get_cached_response("b") is None
+    assert (db_manager.get_cached_response("a"), db_manager.get_cached_response("c")) == ('{"n":0}', '{"n":2}')
+
+
+def test_first_question_column_is_added_and_filled_for_existing_chats(tmp_path):
+    from playhouse.migrate import SchemaMigrator, migrate
+    from keprompt.json_utils import dumps
+    previous = database.database_proxy.obj
+    url = f"sqlite:///{tmp_path}/chats.db"
+    messages = [{"role": "system", "content": [{"type": "text", "text": "Be brief"}]},
+                {"role": "user", "content": [{"type": "text", "text": "What is 2+2?"}]}]
+    try:
+        db = initialize_database(url)
+        migrate(SchemaMigrator.from_database(db).drop_column("chats", "first_question"))
+        assert "first_question" not in {column.name for column in db.get_columns("chats")}
+        database.Chat.insert(chat_id="ffff0006", messages_json=dumps(messages)).execute()
+
+        db = initialize_database(url)
+        assert "first_question" in {column.name for column in db.get_columns("chats")}
+        assert database.Chat.get_by_id("ffff0006").first_question == "What is 2+2?"
+    finally:
+        database.database_proxy.initialize(previous)
+
+
+def test_list_chats_does_not_write(db_manager, monkeypatch):
+    from keprompt.chat_manager import ChatManager
+
+    db_manager.save_chat(chat_id="ffff0007", chat_name="", messages_json="[]", first_question="Stored")
+    db_manager.save_chat(chat_id="ffff0008", chat_name="", messages_json="[]")
+    manager = ChatManager()
+    manager.db_manager = db_manager
+    monkeypatch.setattr(database.Chat, "update", lambda *a, **k: pytest.fail("listing chats wrote to the database"))
+
+    listed = {chat["chat_id"]: chat["first_question"] for chat in manager.list_chats()}
+
+    assert listed == {"ffff0007": "Stored", "ffff0008": ""}
+
+
+def test_sqlite_connections_use_wal_and_busy_timeout(db_manager):
+    db = database.get_database()
+    assert db.execute_sql("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert db.execute_sql("PRAGMA busy_timeout").fetchone()[0] == 5000
+
+
+def test_save_chat_updates_existing_row_in_place(db_manager):
+    assert db_manager.save_chat(chat_id="abab0008", chat_name="", messages_json="[]", prompt_name="hello",
+                                total_api_calls=1) is True
+    created = database.Chat.get_by_id("abab0008").created_timestamp
+
+    assert db_manager.save_chat(chat_id="abab0008", chat_name="", messages_json='[{"role":"user"}]',
+                                prompt_name="hello", total_api_calls=2) is False
+
+    chat = database.Chat.get_by_id("abab0008")
+    assert (chat.messages_json, chat.total_api_calls, chat.created_timestamp) == ('[{"role":"user"}]', 2, created)
+
+
+@pytest.mark.parametrize("pack_refs", [False, True])
+def test_git_commit_is_read_from_repository_files(tmp_path, monkeypatch, pack_refs):
+    import subprocess
+    from keprompt import chat_manager
+
+    def git(*args):
+        return subprocess.run(["git", "-C", str(tmp_path), *args], check=True,
+                              capture_output=True, text=True).stdout.strip()
+
+    git("init", "-q")
+    git("-c", "user.name=t", "-c", "user.email=t@t", "commit", "-q", "--allow-empty", "-m", "init")
+    if pack_refs:
+        git("pack-refs", "--all")
+    expected = git("rev-parse", "HEAD")[:8]
+    (tmp_path / "sub").mkdir()
+    monkeypatch.chdir(tmp_path / "sub")
+    monkeypatch.delenv("GIT_DIR", raising=False)
+    chat_manager._git_commit.cache_clear()
+    try:
+        with monkeypatch.context() as m:
+            m.setattr(chat_manager.subprocess, "run", lambda *a, **k: pytest.fail("git should not run"))
+            assert chat_manager._git_commit() == expected
+    finally:
+        chat_manager._git_commit.cache_clear()
@@ -81,3 +81,19 @@ def test_wildcard_plus_bare(fs):
 def test_no_duplicates(fs):
     result = fs.resolve_function_names(["get_clients", "epicure_tools.*"])
     assert result.count("get_clients") == 1
+
+
+# --- lazy singleton ---
+
+def test_functions_singleton_loads_on_first_access(tmp_path):
+    import subprocess
+    import sys
+    code = (
+        "import keprompt, os\n"
+        "from keprompt.keprompt_function_space import FunctionSpace\n"
+        "assert not FunctionSpace._instances and not os.path.exists('prompts')\n"
+        "space = FunctionSpace.functions\n"
+        "assert FunctionSpace.functions is space and FunctionSpace.__dict__['functions'] is space\n"
+        "assert space.tools_array == []\n"
+    )
+    subprocess.run([sys.executable, "-c", code], cwd=tmp_path, check=True)
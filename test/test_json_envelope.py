@@ -279,6 +279,14 @@ class TestPromptManager:
 class TestChatManagerGet:
     """Test execute_get envelope shapes."""
 
+    def test_constructing_manager_does_not_run_git(self):
+        from keprompt.chat_manager import ChatManager
+
+        with patch("keprompt.chat_manager.subprocess.run") as run:
+            ChatManager(make_args(command="chat", chat_command="get", chat_id=None, limit=None))
+
+        run.assert_not_called()
+
     def test_list_chats_empty(self):
         from keprompt.chat_manager import ChatManager
 
@@ -414,8 +422,7 @@ class TestChatManagerCreate:
         mock_vm.prompt.to_json.return_value = []
 
         with patch("keprompt.chat_manager.VM", return_value=mock_vm) as mock_vm_cls, \
-             patch.object(mgr, "save_chat"), \
-             patch.object(mgr, "_make_variables_serializable", return_value={"name": "World"}):
+             patch.object(mgr, "save_chat"):
             mock_vm.execute.return_value = None
             response = mgr.execute_create()
 
@@ -508,6 +515,17 @@ class TestHandleJsonCommand:
         assert "source" in response
         assert_json_serializable(response)
 
+    def test_cli_registers_only_the_named_command_group(self):
+        code = (
+            "import sys\n"
+            "sys.argv = ['keprompt', 'get', 'models']\n"
+            "from keprompt.keprompt import get_cmd_args\n"
+            "parser, args = get_cmd_args()\n"
+            "assert (args.command, args.models_command) == ('models', 'get')\n"
+            "assert 'keprompt.chat_manager' not in sys.modules\n"
+        )
+        subprocess.run([sys.executable, "-c", code], check=True, timeout=30)
+
 
 # ---------------------------------------------------------------------------
 # CLI Envelope integration tests (subprocess)
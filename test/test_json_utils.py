@@ -0,0 +1,132 @@
+"""
+Tests for safe_json_loads.
+
+The parser prefers orjson when it is installed; these cases must behave the
+same with either codec.
+"""
+
+import json
+
+import pytest
+
+from keprompt.json_utils import safe_json_loads
+
+
+def test_valid_object():
+    assert safe_json_loads('{"filename": "x", "lines": [1, 2]}') == {"filename": "x", "lines": [1, 2]}
+
+
+def test_non_ascii():
+    assert safe_json_loads('{"text": "héllo ✓"}') == {"text": "héllo ✓"}
+
+
+def test_trailing_junk_is_repaired():
+    assert safe_json_loads('{"a": 1} trailing words') == {"a": 1}
+
+
+def test_missing_braces_are_repaired():
+    assert safe_json_loads('"action": "search", "query": "foo"') == {"action": "search", "query": "foo"}
+
+
+def test_unrecoverable_raises_stdlib_error():
+    with pytest.raises(json.JSONDecodeError):
+        safe_json_loads("{{not json", context="test")
+
+
+# --- dumps_bytes / json_fragment ---
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_dumps_bytes_embeds_fragment(monkeypatch, use_orjson):
+    from keprompt import json_utils
+    if not use_orjson:
+        monkeypatch.setattr(json_utils, "orjson", None)
+    tools = [{"name": "readfile", "description": "Lire un fichier ✓"}]
+    body = json_utils.dumps_bytes({"model": "m", "tools": json_utils.json_fragment(tools)})
+    assert isinstance(body, bytes)
+    assert json.loads(body) == {"model": "m", "tools": tools}
+    assert body.startswith(b'{"model":"m","tools":[')
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_dumps_bytes_non_str_keys(monkeypatch, use_orjson):
+    from keprompt import json_utils
+    if not use_orjson:
+        monkeypatch.setattr(json_utils, "orjson", None)
+    assert json.loads(json_utils.dumps_bytes({1: "a", "b": 2})) == {"1": "a", "b": 2}
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_dumps_returns_compact_text(monkeypatch, use_orjson):
+    from keprompt import json_utils
+    if not use_orjson:
+        monkeypatch.setattr(json_utils, "orjson", None)
+    text = json_utils.dumps({"role": "user", "text": "Café ✓"})
+    assert text == '{"role":"user","text":"Café ✓"}'
+    assert json_utils.loads(text) == {"role": "user", "text": "Café ✓"}
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_dumps_encodes_integers_wider_than_64_bits(monkeypatch, use_orjson):
+    from pathlib import Path
+    from keprompt import json_utils
+    if not use_orjson:
+        monkeypatch.setattr(json_utils, "orjson", None)
+    text = json_utils.dumps({"big": 2 ** 70, "path": Path("a")}, default=str)
+    assert json_utils.loads(text) == {"big": 2 ** 70, "path": "a"}
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_dumps_default_hook_sees_only_non_native_leaves(monkeypatch, use_orjson):
+    from pathlib import Path
+    from keprompt import json_utils
+    from keprompt.ModelManager import AiModel
+    if not use_orjson:
+        monkeypatch.setattr(json_utils, "orjson", None)
+    model = AiModel("anthropic", "Anthropic", "anthropic/m", 1e-6, 2e-6, 100)
+    variables = {"n": 1, "path": Path("a/b"), "nested": {"model": model, "items": [Path("c")]}}
+    assert json_utils.loads(json_utils.dumps(variables, default=str)) == {
+        "n": 1, "path": "a/b", "nested": {"model": str(model), "items": ["c"]},
+    }
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_json_output_of_models_does_not_depend_on_orjson(monkeypatch, use_orjson):
+    from keprompt import json_utils
+    from keprompt.ModelManager import AiModel
+    from keprompt.output_formatter import OutputFormatter
+    if not use_orjson:
+        monkeypatch.setattr(json_utils, "orjson", None)
+    model = AiModel("anthropic", "Anthropic", "anthropic/m", 1e-6, 2e-6, 100)
+    output = json.loads(OutputFormatter.format({"models": [model]}, "json"))
+    assert output["models"][0]["model"] == "anthropic/m"
+    assert output["models"][0]["input_cost"] == 1e-6
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_dumps_pretty_uses_default_hook(monkeypatch, use_orjson):
+    from decimal import Decimal
+    from keprompt import json_utils
+    from keprompt.CustomEncoder import encode_default
+    if not use_orjson:
+        monkeypatch.setattr(json_utils, "orjson", None)
+    body = json_utils.dumps_pretty({"cost": Decimal("0.5"), "name": "modèle"}, default=encode_default)
+    assert body == '{\n  "cost": 0.5,\n  "name": "modèle"\n}'.encode("utf-8")
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_peewee_rows_encode_nested_values(monkeypatch, use_orjson):
+    from datetime import datetime
+    from decimal import Decimal
+    from peewee import DateTimeField, DecimalField, Model
+    from keprompt import json_utils
+    from keprompt.CustomEncoder import encode_default
+    if not use_orjson:
+        monkeypatch.setattr(json_utils, "orjson", None)
+
+    class Row(Model):
+        cost = DecimalField()
+        created = DateTimeField()
+
+    row = Row(cost=Decimal("0.25"), created=datetime(2025, 1, 2, 3, 4, 5))
+    body = json_utils.dumps_pretty({"rows": [row]}, default=encode_default)
+    assert json.loads(body) == {"rows": [{"cost": 0.25, "created": "2025-01-02T03:04:05"}]}
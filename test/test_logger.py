@@ -0,0 +1,27 @@
+"""
+Tests for StandardLogger output batching.
+"""
+
+import io
+
+from rich.console import Console
+
+from keprompt.keprompt_logger import LogMode, StandardLogger
+
+
+def test_batch_writes_debug_output_once_on_exit():
+    logger = StandardLogger("t", mode=LogMode.DEBUG)
+    out = io.StringIO()
+    logger.console = Console(file=out)
+    with logger.batch():
+        logger.log_info("a")
+        with logger.batch():
+            logger.log_llm("b")
+        assert out.getvalue() == ""
+    assert out.getvalue() == "INFO: a\nLLM: b\n"
+
+
+def test_batch_is_noop_outside_debug():
+    logger = StandardLogger("t", mode=LogMode.PRODUCTION)
+    with logger.batch():
+        logger.log_info("ignored")
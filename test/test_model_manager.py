@@ -0,0 +1,93 @@
+"""
+Tests for ModelManager loading of the LiteLLM model catalog.
+
+The catalog is parsed once per process; a forced reload (after
+'models update') re-parses only when the file actually changed.
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+from keprompt.ModelManager import ModelManager
+
+
+def write_catalog(path, models):
+    path.write_text(json.dumps({
+        name: {"litellm_provider": "anthropic", "mode": "chat", "input_cost_per_token": 1e-6,
+               "output_cost_per_token": 2e-6, "max_tokens": 1000}
+        for name in models
+    }))
+
+
+@pytest.fixture
+def catalog(tmp_path, monkeypatch):
+    path = tmp_path / "prompts" / "functions" / "model_prices_and_context_window.json"
+    path.parent.mkdir(parents=True)
+    write_catalog(path, ["claude-a"])
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(ModelManager, "models", {})
+    monkeypatch.setattr(ModelManager, "_initialized", False)
+    monkeypatch.setattr(ModelManager, "_db_stamp", None)
+
+    module = sys.modules["keprompt.ModelManager"]
+    parses = []
+    original = module.loads
+    monkeypatch.setattr(module, "loads", lambda data: parses.append(1) or original(data))
+    return path, parses
+
+
+def test_catalog_parsed_once(catalog):
+    _, parses = catalog
+    assert ModelManager.get_model("anthropic/claude-a").input_cost == 1e-6
+    ModelManager.get_model("anthropic/claude-a")
+    assert len(parses) == 1
+
+
+def test_forced_reload_skips_unchanged_file(catalog):
+    path, parses = catalog
+    ModelManager._load_all_models()
+    ModelManager._load_all_models(force=True)
+    assert len(parses) == 1
+
+    write_catalog(path, ["claude-a", "claude-bb"])
+    os.utime(path, ns=(0, 0))
+    ModelManager._load_all_models(force=True)
+    assert len(parses) == 2
+    assert "anthropic/claude-bb" in ModelManager.models
+
+
+def test_loaded_models_are_immutable(catalog):
+    from dataclasses import FrozenInstanceError
+    model = ModelManager.get_model("anthropic/claude-a")
+    with pytest.raises(FrozenInstanceError):
+        model.input_cost = 0.0
+
+
+def test_provider_list_counts_models(catalog):
+    from argparse import Namespace
+    from keprompt.api import ProviderManager
+    path, _ = catalog
+    write_catalog(path, ["claude-a", "claude-bb", "claude-ccc"])
+    result = ProviderManager(Namespace(provider_command="list")).execute()
+    assert result["data"] == [{"name": "anthropic", "models_count": 3}]
+
+
+def test_models_get_filters_case_insensitively(catalog):
+    from argparse import Namespace
+    path, _ = catalog
+    write_catalog(path, ["claude-a", "claude-bb", "other-c"])
+    args = Namespace(models_command="get", name="CLAUDE", provider="Anthropic", company=None, pretty=False)
+    response = ModelManager(args).execute()
+    assert sorted(m["model"] for m in response["data"]) == ["anthropic/claude-a", "anthropic/claude-bb"]
+
+
+def test_model_to_dict_matches_asdict():
+    from dataclasses import asdict
+    from keprompt.ModelManager import AiModel
+    model = AiModel("anthropic", "Anthropic", "anthropic/m", 1e-6, 2e-6, 100, supports={"vision": True})
+    data = model.to_dict()
+    assert data == asdict(model)
+    assert data["supports"] is not model.supports
@@ -0,0 +1,250 @@
+"""
+Tests for provider message conversion (to_company_messages / to_ai_message).
+
+Covers: Anthropic, Google and Mistral wire formats, system-message
+extraction, and rejection of unknown part types.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from keprompt.AiAnthropic import AiAnthropic
+from keprompt.AiGoogle import AiGoogle
+from keprompt.AiMistral import AiMistral
+from keprompt.AiPrompt import AiCall, AiImagePart, AiMessage, AiMessagePart, AiResult, AiTextPart
+
+
+class FakeVM:
+    ip = 0
+    allowed_functions = None
+
+    def substitute(self, text):
+        return text
+
+
+class UnknownPart(AiMessagePart):
+    def __init__(self, vm):
+        super().__init__(vm=vm, part_type="mystery")
+
+    def to_json(self):
+        return {}
+
+    def print_message(self):
+        return ""
+
+
+@pytest.fixture
+def vm():
+    return FakeVM()
+
+
+@pytest.fixture
+def messages(vm):
+    return [
+        AiMessage(vm, "system", [AiTextPart(vm, "be brief")]),
+        AiMessage(vm, "user", [AiTextPart(vm, "hi")]),
+        AiMessage(vm, "assistant", [AiTextPart(vm, "ok"), AiCall(vm, "readfile", {"filename": "x"}, id="c1")]),
+        AiMessage(vm, "tool", [AiResult(vm, "readfile", "c1", "contents")]),
+    ]
+
+
+def make_handler(cls, vm):
+    handler = cls(SimpleNamespace(vm=vm, model="m", provider="p"))
+    handler.system_message = None
+    return handler
+
+
+# --- to_company_messages ---
+
+def test_anthropic_messages(vm, messages):
+    handler = make_handler(AiAnthropic, vm)
+    result = handler.to_company_messages(messages)
+    assert handler.system_message == "be brief"
+    assert result == [
+        {"role": "user", "content": [{"type": "text", "text": "hi"}]},
+        {"role": "assistant", "content": [
+            {"type": "text", "text": "ok"},
+            {"type": "tool_use", "id": "c1", "name": "readfile", "input": {"filename": "x"}},
+        ]},
+        {"role": "user", "content": [{"type": "tool_result", "tool_use_id": "c1", "content": "contents"}]},
+    ]
+
+
+def test_google_messages(vm, messages):
+    handler = make_handler(AiGoogle, vm)
+    result = handler.to_company_messages(messages)
+    assert handler.system_message == "be brief"
+    assert result == [
+        {"role": "user", "parts": [{"text": "hi"}]},
+        {"role": "assistant", "parts": [
+            {"text": "ok"},
+            {"functionCall": {"name": "readfile", "args": {"filename": "x"}}},
+        ]},
+        {"role": "tool", "parts": [
+            {"functionResponse": {"name": "readfile", "response": "contents", "id": "c1"}},
+        ]},
+    ]
+
+
+def test_mistral_messages(vm, messages):
+    handler = make_handler(AiMistral, vm)
+    result = handler.to_company_messages(messages)
+    assert handler.system_message == "be brief"
+    assert result == [
+        {"role": "user", "content": [{"type": "text", "text": "hi"}]},
+        {"role": "assistant", "content": [{"type": "text", "text": "ok"}], "tool_calls": [
+            {"id": "c1", "type": "function", "function": {"name": "readfile", "arguments": {"filename": "x"}}},
+        ]},
+        {"role": "tool", "content": "contents", "tool_call_id": "c1"},
+    ]
+
+
+def test_mistral_image_data_url(vm, tmp_path):
+    image = tmp_path / "dot.png"
+    image.write_bytes(b"\x89PNG")
+    part = AiImagePart(vm, str(image))
+    handler = make_handler(AiMistral, vm)
+    result = handler.to_company_messages([AiMessage(vm, "user", [part])])
+    assert result == [{"role": "user", "content": [
+        {"type": "image_url", "image_url": {"url": "data:image/png;base64,iVBORw=="}},
+    ]}]
+    assert part.data_url is part.data_url
+
+
+@pytest.mark.parametrize("cls, error", [(AiAnthropic, Exception), (AiGoogle, Exception), (AiMistral, ValueError)])
+def test_unknown_part_type(vm, cls, error):
+    handler = make_handler(cls, vm)
+    with pytest.raises(error, match="Unknown part type: mystery"):
+        handler.to_company_messages([AiMessage(vm, "user", [UnknownPart(vm)])])
+
+
+# --- tools arrays ---
+
+def test_tools_transform_cached_per_tools_array(monkeypatch):
+    from keprompt.AiProvider import tools_transform
+    from keprompt.keprompt_function_space import FunctionSpace
+
+    tool = {"function": {"name": "readfile", "description": "", "parameters": {}}}
+    space = SimpleNamespace(tools_array=[tool])
+    space.get_filtered_tools_array = lambda allowed: [t for t in space.tools_array if t["function"]["name"] in allowed]
+    monkeypatch.setattr(FunctionSpace, "functions", space)
+
+    calls = []
+
+    @tools_transform
+    def names(filtered):
+        calls.append(1)
+        return tuple(t["function"]["name"] for t in filtered)
+
+    assert names(["readfile"]) == ("readfile",)
+    assert names(["readfile"]) == ("readfile",)
+    assert len(calls) == 1
+    space.tools_array = []
+    assert names(["readfile"]) == ()
+    assert len(calls) == 2
+
+
+def test_tools_transform_key_keeps_the_array_alive():
+    import gc
+    import weakref
+    from keprompt.AiProvider import _Identity
+
+    class Tools(list):
+        pass
+
+    tools = Tools()
+    ref = weakref.ref(tools)
+    key = _Identity(tools)
+    del tools
+    gc.collect()
+
+    # While a cache entry holds the key, the array keeps its id() to itself
+    assert ref() is not None and key == _Identity(ref()) and key != _Identity(Tools())
+
+
+@pytest.mark.parametrize("cls", [AiAnthropic, AiMistral])
+def test_request_envelope_built_once(vm, monkeypatch, cls):
+    from keprompt.ModelManager import ModelManager
+    lookups = []
+    def get_model(name):
+        lookups.append(name)
+        return SimpleNamespace(get_api_model_name=lambda: "api-m")
+    monkeypatch.setattr(ModelManager, "get_model", get_model)
+
+    handler = make_handler(cls, vm)
+    first = handler.prepare_request([{"role": "user"}])
+    second = handler.prepare_request([])
+    assert first["model"] == "api-m" and first["messages"] == [{"role": "user"}]
+    assert second["messages"] == [] and "messages" not in handler._request_envelope()
+    assert lookups == ["m"]
+
+
+# --- to_ai_message ---
+
+def test_anthropic_response(vm):
+    handler = make_handler(AiAnthropic, vm)
+    msg = handler.to_ai_message({"content": [
+        {"type": "thinking", "thinking": "hmm"},
+        {"type": "text", "text": "hey"},
+        {"type": "tool_use", "id": "t1", "name": "readfile", "input": {"filename": "x"}},
+    ]})
+    assert msg.role == "assistant"
+    assert [p.type for p in msg.content] == ["text", "call"]
+    assert msg.content[1].arguments == {"filename": "x"}
+
+
+def test_anthropic_response_without_content(vm):
+    handler = make_handler(AiAnthropic, vm)
+    assert handler.to_ai_message({"content": None}).content == []
+
+
+def test_google_response(vm):
+    handler = make_handler(AiGoogle, vm)
+    msg = handler.to_ai_message({"candidates": [{"content": {"parts": [
+        {"text": "hey"},
+        {"functionCall": {"name": "readfile", "args": {"filename": "x"}}},
+    ]}}]})
+    assert [p.type for p in msg.content] == ["text", "call"]
+    assert msg.content[1].id == ""
+
+
+def test_google_response_without_candidates(vm):
+    handler = make_handler(AiGoogle, vm)
+    with pytest.raises(Exception, match="No response candidates"):
+        handler.to_ai_message({})
+
+
+def test_mistral_response(vm):
+    handler = make_handler(AiMistral, vm)
+    msg = handler.to_ai_message({"choices": [{"message": {
+        "content": "hey",
+        "tool_calls": [{"id": "t1", "function": {"name": "readfile", "arguments": '{"filename": "x"}'}}],
+    }}]})
+    assert [p.type for p in msg.content] == ["text", "call"]
+    assert msg.content[1].arguments == {"filename": "x"}
+
+
+def test_mistral_response_empty(vm):
+    handler = make_handler(AiMistral, vm)
+    assert handler.to_ai_message({}).content == []
+
+
+# --- incremental conversion ---
+
+def test_company_messages_converts_only_new_messages(vm, messages, monkeypatch):
+    prompt = SimpleNamespace(vm=vm, model="m", provider="p", messages=messages[:2])
+    handler = AiAnthropic(prompt)
+    converted = []
+    original = handler.to_company_messages
+    monkeypatch.setattr(handler, "to_company_messages", lambda msgs: converted.append(len(msgs)) or original(msgs))
+
+    assert len(handler.company_messages()) == 1
+    prompt.messages = messages
+    result = handler.company_messages()
+    assert result == original(messages)
+    assert handler.system_message == "be brief"
+    assert converted == [2, 2]
+
+    prompt.messages = messages[1:2]
+    assert handler.company_messages() == original(messages[1:2])